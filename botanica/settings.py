@@ -99,6 +99,25 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/ref/settings/#caches
+# Rendered product cards, catalog version stamps, facet counts and signed
+# media URLs are shared between workers, so the cache must be too. The
+# default keeps it in the database (table created by the products
+# migrations); point CACHE_BACKEND/CACHE_LOCATION at Memcached or Redis
+# to move it out.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'django_cache'),
+    }
+}
+if CACHES['default']['BACKEND'] == 'django.core.cache.backends.db.DatabaseCache':
+    # The default of 300 entries is far fewer than one signed URL per
+    # image variant, and culling would keep throwing the shared URLs away
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 50000))}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -142,7 +161,8 @@ MEDIA_URL = f'https://{os.environ.get("AWS_STORAGE_BUCKET_NAME")}.s3.{os.environ
 STATIC_URL = f'https://{os.environ.get("AWS_STORAGE_BUCKET_NAME")}.s3.{os.environ.get("AWS_S3_REGION_NAME")}.amazonaws.com/static/'
 
 # AWS S3 Configuration
-DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
+# MediaStorage memoizes signed URLs instead of signing on every render
+DEFAULT_FILE_STORAGE = 'botanica.storage.MediaStorage'
 STATICFILES_STORAGE = 'storages.backends.s3boto3.S3StaticStorage'
 
 # Use S3-specific credentials
@@ -156,9 +176,12 @@ AWS_DEFAULT_ACL = None
 # Additional required S3 settings
 AWS_S3_ADDRESSING_STYLE = 'virtual'  # Required for newer S3 regions
 AWS_S3_SIGNATURE_VERSION = 's3v4'    # Required for eu-west-1 region
-AWS_QUERYSTRING_AUTH = True          # Enable querystring auth for private files
+AWS_QUERYSTRING_AUTH = os.environ.get('AWS_QUERYSTRING_AUTH', 'True') == 'True'  # Enable querystring auth for private files
 AWS_QUERYSTRING_EXPIRE = 604800      # Set URL expiration to 7 days (in seconds)
 
+# Serve media through CloudFront when a distribution domain is configured
+AWS_S3_CUSTOM_DOMAIN = os.environ.get('AWS_S3_CUSTOM_DOMAIN')
+
 # Performance optimization for S3
 AWS_S3_OBJECT_PARAMETERS = {
     'CacheControl': 'max-age=86400',
@@ -175,6 +198,12 @@ AWS_SES_SENDER_EMAIL = os.environ.get('AWS_SES_SENDER_EMAIL')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Where anonymous carts are kept: 'database' stores CartItem rows keyed by
+# session, 'session' stores plant IDs and quantities in the session itself
+# (a signed cookie with SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies')
+CART_ANONYMOUS_STORAGE = os.environ.get('CART_ANONYMOUS_STORAGE', 'database')
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.db')
+
 # Login/Logout URLs
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
@@ -0,0 +1,64 @@
+import hashlib
+import time
+from django.core.cache import cache
+from django.utils.encoding import filepath_to_uri
+from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name
+
+class MediaStorage(S3Boto3Storage):
+    """
+    S3 storage whose url() avoids signing on every call.
+
+    - CloudFront (AWS_S3_CUSTOM_DOMAIN) without a signer and public buckets
+      get plain, stable URLs built without botocore.
+    - Signed URLs are memoized per object, first in this process and then
+      in the cache shared by all workers (settings.CACHES), until shortly
+      before AWS_QUERYSTRING_EXPIRE, so every worker hands out the same
+      URL and browsers/CDNs can cache it.
+    """
+    # Stop handing out a signed URL this many seconds before it expires
+    url_expiry_margin = 60 * 60
+    # Upper bound on URLs kept in the per-process memo
+    local_url_limit = 10000
+
+    def __init__(self, **settings):
+        super().__init__(**settings)
+        self._local_urls = {}
+
+    def url(self, name, parameters=None, expire=None, http_method=None):
+        if parameters or expire is not None or http_method:
+            return super().url(name, parameters, expire, http_method)
+
+        if self.custom_domain:
+            if not (self.querystring_auth and self.cloudfront_signer):
+                return super().url(name)
+        elif not self.querystring_auth and self.region_name:
+            return self._public_url(name)
+
+        lifetime = self.querystring_expire - self.url_expiry_margin
+        if lifetime <= 0:
+            return super().url(name)
+        return self._memoized_url(name, lifetime)
+
+    def _public_url(self, name):
+        name = self._normalize_name(clean_name(name))
+        return f'{self.url_protocol}//{self.bucket_name}.s3.{self.region_name}.amazonaws.com/{filepath_to_uri(name)}'
+
+    def _memoized_url(self, name, lifetime):
+        now = time.time()
+        local = self._local_urls.get(name)
+        if local and local[1] > now:
+            return local[0]
+
+        key = 'media_url:' + hashlib.md5(f'{self.bucket_name}/{name}'.encode()).hexdigest()
+        shared = cache.get(key)
+        if shared and shared[1] > now:
+            url, expires_at = shared
+        else:
+            url, expires_at = super().url(name), now + lifetime
+            cache.set(key, (url, expires_at), lifetime)
+
+        if len(self._local_urls) >= self.local_url_limit:
+            self._local_urls.clear()
+        self._local_urls[name] = (url, expires_at)
+        return url
@@ -27,6 +27,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('orders/', include('orders.urls', namespace='orders')),
     path('products/', include('products.urls', namespace='products')),
+    path('api/products/', include('products.api_urls', namespace='products_api')),
     path('accounts/', include('accounts.urls', namespace='accounts')),
     # Add other app URLs as they are developed
     path('cart/', include('cart.urls', namespace='cart')),
@@ -1,7 +1,9 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from products.models import Category
+from products.conditional import catalog_condition
 
+@catalog_condition(names=('category',), plants=False)
 def home(request):
     """
     View for the homepage of the Botanica e-commerce platform.
@@ -1,7 +1,47 @@
+import time
+from collections import namedtuple
 from decimal import Decimal
 from django.conf import settings
-from products.models import Plant
-from .models import CartItem
+from django.core.files.storage import default_storage
+from django.db import transaction
+from . import reservations
+from .storage import get_storage
+
+# Orders at or above this subtotal ship for free
+FREE_SHIPPING_THRESHOLD = Decimal('50')
+SHIPPING_COST = Decimal('5')
+
+CartLine = namedtuple('CartLine', ['plant_id', 'name', 'price', 'quantity', 'total_price', 'image', 'stock'])
+
+class CartSnapshot:
+    """
+    Read-only contents and totals of a cart, loaded once per request.
+    Iterating yields CartLine tuples; len() is the number of lines.
+    """
+    __slots__ = ('items', 'item_count', 'subtotal', 'shipping_cost', 'total')
+
+    def __init__(self, items):
+        items = tuple(items)
+        subtotal = sum((line.total_price for line in items), Decimal('0'))
+        shipping_cost = SHIPPING_COST if items and subtotal < FREE_SHIPPING_THRESHOLD else Decimal('0')
+        values = {
+            'items': items,
+            'item_count': sum(line.quantity for line in items),
+            'subtotal': subtotal,
+            'shipping_cost': shipping_cost,
+            'total': subtotal + shipping_cost,
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('CartSnapshot is read-only')
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
 
 class Cart:
     """
@@ -11,91 +51,84 @@ class Cart:
         self.request = request
         self.session = request.session
         self.user = request.user
+        self.storage = get_storage(request)
         
     def __iter__(self):
         """
-        Iterate over the items in the cart and get the plants from the database
+        Iterate over the lines of the cart snapshot
         """
-        if self.user.is_authenticated:
-            cart_items = CartItem.objects.filter(user=self.user)
-        else:
-            session_id = self.session.session_key
-            if not session_id:
-                self.session.create()
-                session_id = self.session.session_key
-            cart_items = CartItem.objects.filter(session_id=session_id)
-        
-        for item in cart_items:
-            yield {
-                'plant_id': item.plant.id,
-                'name': item.plant.name,
-                'price': Decimal(str(item.plant.price)),
-                'quantity': item.quantity,
-                'total_price': item.plant.price * item.quantity,
-                'image': item.plant.image.url if item.plant.image else None,
-            }
+        return iter(self.snapshot())
     
     def __len__(self):
         """
         Count all items in the cart
         """
-        if self.user.is_authenticated:
-            return CartItem.objects.filter(user=self.user).count()
-        else:
-            session_id = self.session.session_key
-            if not session_id:
-                return 0
-            return CartItem.objects.filter(session_id=session_id).count()
+        return len(self.snapshot())
+    
+    def snapshot(self):
+        """
+        Return the cart's CartSnapshot, loading the items together with
+        their plants in one query the first time it's needed in a request.
+        Every Cart built for the same request shares it.
+        """
+        snapshot = getattr(self.request, '_cart_snapshot', None)
+        if snapshot is None:
+            snapshot = CartSnapshot(
+                CartLine(
+                    plant_id=plant_id,
+                    name=name,
+                    price=price,
+                    quantity=quantity,
+                    total_price=price * quantity,
+                    image=default_storage.url(image) if image else None,
+                    stock=stock,
+                )
+                for plant_id, name, price, quantity, image, stock in self.storage.rows()
+            )
+            self.request._cart_snapshot = snapshot
+        return snapshot
     
     def add(self, plant, quantity=1, override_quantity=False):
         """
         Add a plant to the cart or update its quantity
         """
-        plant_obj = Plant.objects.get(id=plant.id)
-        
-        if self.user.is_authenticated:
-            cart_item, created = CartItem.objects.get_or_create(
-                user=self.user,
-                plant=plant_obj,
-                defaults={'quantity': 0}
-            )
-        else:
-            session_id = self.session.session_key
-            if not session_id:
-                self.session.create()
-                session_id = self.session.session_key
-            
-            cart_item, created = CartItem.objects.get_or_create(
-                session_id=session_id,
-                plant=plant_obj,
-                defaults={'quantity': 0}
-            )
-        
-        if override_quantity:
-            cart_item.quantity = quantity
-        else:
-            cart_item.quantity += quantity
-        
-        cart_item.save()
+        self.add_many({plant.id: quantity}, override_quantity=override_quantity)
+    
+    def add_many(self, quantities, override_quantity=False):
+        """
+        Add several plants at once from {plant_id: quantity}
+        """
+        # The cart write and the stock hold commit together, so
+        # InsufficientStock leaves the cart unchanged
+        with transaction.atomic():
+            totals = self.storage.add_many(quantities, override_quantity)
+            reservations.reserve(reservations.get_owner(self.request, create=True), totals)
+        self._mark_changed()
     
     def remove(self, plant):
         """
         Remove a plant from the cart
         """
-        if self.user.is_authenticated:
-            CartItem.objects.filter(user=self.user, plant=plant).delete()
-        else:
-            session_id = self.session.session_key
-            if session_id:
-                CartItem.objects.filter(session_id=session_id, plant=plant).delete()
+        self.storage.remove(plant)
+        owner = reservations.get_owner(self.request)
+        if owner is not None:
+            reservations.release(owner, [plant.id])
+        self._mark_changed()
     
     def clear(self):
         """
         Remove all items from the cart
         """
-        if self.user.is_authenticated:
-            CartItem.objects.filter(user=self.user).delete()
-        else:
-            session_id = self.session.session_key
-            if session_id:
-                CartItem.objects.filter(session_id=session_id).delete()
+        self.storage.clear()
+        owner = reservations.get_owner(self.request)
+        if owner is not None:
+            reservations.release(owner)
+        self._mark_changed()
+    
+    def _mark_changed(self):
+        """
+        Record when the cart last changed so conditional GETs of pages
+        showing the cart badge are revalidated, and drop the snapshot.
+        """
+        self.session['cart_version'] = time.time_ns()
+        self.request._cart_snapshot = None
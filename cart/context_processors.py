@@ -1,23 +1,17 @@
-from .models import CartItem
+from .cart import Cart
 
 def cart(request):
     """
-    Context processor to make cart items available to all templates
+    Context processor to make the cart available to all templates.
+
+    The values are callables, which templates call when they are rendered,
+    so pages that never show the cart don't query it and visitors without
+    a session don't get one. They share the request's cart snapshot with
+    the cart and checkout views.
     """
-    if request.user.is_authenticated:
-        cart_items = CartItem.objects.filter(user=request.user)
-    else:
-        session_id = request.session.session_key
-        if not session_id:
-            request.session.create()
-            session_id = request.session.session_key
-        cart_items = CartItem.objects.filter(session_id=session_id)
-    
-    total_items = sum(item.quantity for item in cart_items)
-    total_price = sum(item.total_price() for item in cart_items)
-    
+    cart = Cart(request)
     return {
-        'cart_items': cart_items,
-        'total_items': total_items,
-        'total_price': total_price,
+        'cart_items': lambda: cart.snapshot().items,
+        'total_items': lambda: cart.snapshot().item_count,
+        'total_price': lambda: cart.snapshot().subtotal,
     }
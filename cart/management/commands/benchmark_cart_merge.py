@@ -0,0 +1,67 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from cart.models import CartItem
+from cart.storage import merge_database_cart
+from products.models import Category, Plant
+
+class Command(BaseCommand):
+    help = 'Measures login cart merge latency for anonymous carts of different sizes (all changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1, 50, 500],
+            help='Anonymous cart sizes (lines) to measure',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=5,
+            help='Number of merges timed per size',
+        )
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            timings = []
+            for _ in range(options['rounds']):
+                elapsed, queries, merged = self._measure(size)
+                timings.append(elapsed)
+            timings.sort()
+            median = timings[len(timings) // 2]
+            self.stdout.write(
+                f'{size} lines: median {median * 1000:.1f}ms, best {timings[0] * 1000:.1f}ms '
+                f'({queries} queries, {merged} lines merged)'
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark data rolled back'))
+
+    def _measure(self, size):
+        """
+        Build an anonymous cart of `size` lines, half of them for plants the
+        user already has, time one merge and roll everything back.
+        """
+        with transaction.atomic():
+            category = Category.objects.create(name='Cart merge benchmark')
+            plants = Plant.objects.bulk_create([
+                Plant(name=f'Benchmark plant {i}', category=category, price=10, description='', stock=5)
+                for i in range(size)
+            ])
+            user = User.objects.create(username=f'cart-merge-benchmark-{time.time_ns()}')
+            session_id = f'benchmark-{time.time_ns()}'
+            now = timezone.now()
+            CartItem.objects.bulk_create(
+                [CartItem(session_id=session_id, plant=plant, quantity=3, date_added=now) for plant in plants]
+                + [CartItem(user=user, plant=plant, quantity=4, date_added=now) for plant in plants[::2]]
+            )
+
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                merged = merge_database_cart(session_id, user)
+                elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        return elapsed, len(queries), merged
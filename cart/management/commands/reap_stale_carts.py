@@ -0,0 +1,99 @@
+import datetime
+import time
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, Max, Min, OuterRef, Q
+from django.utils import timezone
+from cart.models import CartItem
+
+# Engines that keep sessions in the django_session table
+DATABASE_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+class Command(BaseCommand):
+    help = 'Deletes expired sessions and abandoned anonymous carts in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Delete anonymous cart lines added more than this many days ago',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Maximum number of rows deleted per statement',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Seconds to sleep between batches to leave room for other writers',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pause = options['pause']
+        sessions_in_db = settings.SESSION_ENGINE in DATABASE_SESSION_ENGINES
+
+        # Sessions go first so carts whose session expired are orphaned
+        # and removed in the same run
+        if sessions_in_db:
+            self._report('sessions', *self._reap_sessions(batch_size, pause))
+
+        stale = Q(date_added__lt=timezone.now() - datetime.timedelta(days=options['days']))
+        if sessions_in_db:
+            stale |= ~Exists(Session.objects.filter(session_key=OuterRef('session_id')))
+        self._report('anonymous cart lines', *self._reap_carts(stale, batch_size, pause))
+
+    def _reap_sessions(self, batch_size, pause):
+        """
+        Delete expired sessions a batch of keys at a time, walking the
+        primary key so each statement touches at most `batch_size` rows.
+        """
+        now = timezone.now()
+        start = time.monotonic()
+        deleted = 0
+        last_key = ''
+        while True:
+            keys = list(
+                Session.objects.filter(expire_date__lt=now, session_key__gt=last_key)
+                .order_by('session_key')
+                .values_list('session_key', flat=True)[:batch_size]
+            )
+            if not keys:
+                break
+            deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+            last_key = keys[-1]
+            if pause:
+                time.sleep(pause)
+        return deleted, time.monotonic() - start
+
+    def _reap_carts(self, stale, batch_size, pause):
+        """
+        Delete stale anonymous cart lines one primary-key range at a time.
+        """
+        start = time.monotonic()
+        deleted = 0
+        bounds = CartItem.objects.filter(user__isnull=True).aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is not None:
+            for low in range(bounds['low'], bounds['high'] + 1, batch_size):
+                deleted += (
+                    CartItem.objects.filter(id__gte=low, id__lt=low + batch_size, user__isnull=True)
+                    .filter(stale)
+                    .delete()[0]
+                )
+                if pause:
+                    time.sleep(pause)
+        return deleted, time.monotonic() - start
+
+    def _report(self, label, deleted, elapsed):
+        rate = deleted / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} {label} in {elapsed:.1f}s ({rate:.0f} rows/s)'
+        ))
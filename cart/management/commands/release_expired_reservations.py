@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from cart.reservations import release_expired_reservations
+
+class Command(BaseCommand):
+    help = 'Returns stock held by lapsed cart reservations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of reservations released per transaction',
+        )
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        released = release_expired_reservations(batch_size=options['batch_size'])
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Released {released} expired reservations in {elapsed:.1f}s'
+        ))
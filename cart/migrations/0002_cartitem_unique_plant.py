@@ -0,0 +1,42 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:33
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_items(apps, schema_editor):
+    """
+    Fold duplicate rows for the same plant into the oldest one, summing
+    their quantities, so the unique constraints can be added.
+    """
+    CartItem = apps.get_model('cart', 'CartItem')
+    for owner in ('user', 'session_id'):
+        duplicates = (
+            CartItem.objects.filter(**{f'{owner}__isnull': False})
+            .values(owner, 'plant')
+            .annotate(rows=Count('id'), keep_id=Min('id'), total=Sum('quantity'))
+            .filter(rows__gt=1)
+        )
+        for duplicate in list(duplicates):
+            rows = CartItem.objects.filter(**{owner: duplicate[owner], 'plant': duplicate['plant']})
+            rows.filter(id=duplicate['keep_id']).update(quantity=duplicate['total'])
+            rows.exclude(id=duplicate['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('user', 'plant'), name='unique_user_cart_plant'),
+        ),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('session_id', 'plant'), name='unique_session_cart_plant'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0002_cartitem_unique_plant'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['date_added'], name='cartitem_date_added_idx'),
+        ),
+    ]
@@ -11,8 +11,41 @@ class CartItem(models.Model):
     session_id = models.CharField(max_length=255, null=True, blank=True)  # For anonymous users
     date_added = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        # NULLs never conflict, so user rows and session rows are each
+        # unique per plant without getting in each other's way
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'plant'], name='unique_user_cart_plant'),
+            models.UniqueConstraint(fields=['session_id', 'plant'], name='unique_session_cart_plant'),
+        ]
+        # Lookups by session_id alone use the unique_session_cart_plant index
+        indexes = [
+            models.Index(fields=['date_added'], name='cartitem_date_added_idx'),
+        ]
+    
     def __str__(self):
         return f'{self.quantity} x {self.plant.name}'
     
     def total_price(self):
         return self.quantity * self.plant.price
+
+class StockReservation(models.Model):
+    """
+    A time-limited hold on a plant's stock for the quantity in one cart.
+    While it exists, `quantity` is counted in Plant.reserved.
+    """
+    plant = models.ForeignKey(Plant, on_delete=models.CASCADE, related_name='reservations')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    # Random token kept in an anonymous shopper's session
+    token = models.CharField(max_length=32, null=True, blank=True)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'plant'], name='unique_user_reservation'),
+            models.UniqueConstraint(fields=['token', 'plant'], name='unique_token_reservation'),
+        ]
+    
+    def __str__(self):
+        return f'{self.quantity} x {self.plant_id} until {self.expires_at}'
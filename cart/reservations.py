@@ -0,0 +1,245 @@
+"""
+Time-limited stock holds for carts.
+
+Adding to a cart moves units from a plant's free stock (stock - reserved)
+into Plant.reserved with a conditional UPDATE, so shoppers can never hold
+more than is in stock between them, and no row lock outlives the request.
+Holds lapse after RESERVATION_TTL and are handed back by
+release_expired_reservations().
+"""
+import datetime
+import secrets
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, When
+from django.utils import timezone
+from products.models import Plant
+from products import versions
+from products.facets import invalidate_facet_cache
+from .models import StockReservation
+
+RESERVATION_TTL = datetime.timedelta(minutes=20)
+
+TOKEN_SESSION_KEY = 'cart_token'
+
+class InsufficientStock(Exception):
+    """
+    Raised when a plant can't cover the requested quantity. `available`
+    is the most the holder could have, counting what they already hold.
+    """
+    def __init__(self, plant_id, available):
+        self.plant_id = plant_id
+        self.available = available
+        super().__init__(f'Only {available} of plant {plant_id} available')
+
+def get_owner(request, create=False):
+    """
+    Return the filter identifying the request's holds: the user, or for
+    anonymous shoppers a random token kept in their session. Returns None
+    for an anonymous visitor with no token unless `create` is set.
+    """
+    if request.user.is_authenticated:
+        return {'user': request.user}
+    token = request.session.get(TOKEN_SESSION_KEY)
+    if token is None and create:
+        token = secrets.token_hex(16)
+        request.session[TOKEN_SESSION_KEY] = token
+    return {'token': token} if token else None
+
+def _available(plant_id, held):
+    plant = Plant.objects.filter(pk=plant_id).values('stock', 'reserved').first()
+    if plant is None:
+        return 0
+    return max(plant['stock'] - plant['reserved'] + held, 0)
+
+def _refresh_availability(changes):
+    """
+    After moving {plant_id: change in reserved}, clear the cached in-stock
+    facet counts and catalog validators if any plant went in or out of
+    stock. Most holds leave free stock above zero and cost one SELECT.
+    """
+    if not changes:
+        return
+    for plant_id, stock, reserved in Plant.objects.filter(pk__in=changes).values_list('pk', 'stock', 'reserved'):
+        free = stock - reserved
+        if (free > 0) != (free + changes[plant_id] > 0):
+            invalidate_facet_cache()
+            versions.bump('stock')
+            return
+
+def _release_amounts(amounts):
+    """
+    Hand back {plant_id: quantity} to the plants' free stock in one UPDATE.
+    """
+    if amounts:
+        Plant.objects.filter(pk__in=amounts).update(reserved=Case(
+            *[When(pk=plant_id, then=F('reserved') - quantity) for plant_id, quantity in amounts.items()],
+            output_field=IntegerField(),
+        ))
+        _refresh_availability({plant_id: -quantity for plant_id, quantity in amounts.items()})
+
+def reserve(owner, quantities):
+    """
+    Make the owner's holds match {plant_id: quantity in the cart}, taking
+    extra units from (or returning units to) each plant's free stock and
+    restarting the TTL. All or nothing: if any plant can't cover its
+    quantity, InsufficientStock is raised and the previous holds stand.
+    Negative quantities raise ValueError.
+    """
+    negative = [plant_id for plant_id, quantity in quantities.items() if quantity < 0]
+    if negative:
+        raise ValueError(f'Negative quantity for plant {negative[0]}')
+    expires_at = timezone.now() + RESERVATION_TTL
+    with transaction.atomic():
+        held = dict(
+            StockReservation.objects.select_for_update()
+            .filter(plant_id__in=quantities, **owner)
+            .values_list('plant_id', 'quantity')
+        )
+        taken, returned = {}, {}
+        # Plants are always updated in ID order so concurrent carts can't deadlock
+        for plant_id, quantity in sorted(quantities.items()):
+            delta = quantity - held.get(plant_id, 0)
+            if delta > 0:
+                if not Plant.objects.filter(pk=plant_id, stock__gte=F('reserved') + delta).update(
+                    reserved=F('reserved') + delta
+                ):
+                    raise InsufficientStock(plant_id, _available(plant_id, held.get(plant_id, 0)))
+                taken[plant_id] = delta
+            elif delta < 0:
+                # Only the owner's own hold is handed back, never more
+                returned[plant_id] = min(-delta, held.get(plant_id, 0))
+        _release_amounts(returned)
+        _refresh_availability(taken)
+
+        StockReservation.objects.filter(plant_id__in=[p for p, q in quantities.items() if q <= 0], **owner).delete()
+        unique_fields = ['user', 'plant'] if 'user' in owner else ['token', 'plant']
+        StockReservation.objects.bulk_create(
+            [
+                StockReservation(plant_id=plant_id, quantity=quantity, expires_at=expires_at, **owner)
+                for plant_id, quantity in quantities.items() if quantity > 0
+            ],
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=['quantity', 'expires_at'],
+        )
+
+def release(owner, plant_ids=None):
+    """
+    Drop the owner's holds (on every plant, or only `plant_ids`) and
+    return their units to free stock.
+    """
+    holds = StockReservation.objects.filter(**owner)
+    if plant_ids is not None:
+        holds = holds.filter(plant_id__in=plant_ids)
+    with transaction.atomic():
+        rows = list(holds.select_for_update().values_list('id', 'plant_id', 'quantity'))
+        _release_rows(rows)
+
+def _release_rows(rows):
+    amounts = {}
+    for reservation_id, plant_id, quantity in rows:
+        amounts[plant_id] = amounts.get(plant_id, 0) + quantity
+    _release_amounts(amounts)
+    StockReservation.objects.filter(id__in=[row[0] for row in rows]).delete()
+
+def consume(owner, quantities):
+    """
+    Sell {plant_id: quantity}: take it from stock, using up the owner's
+    holds first, and delete those holds. Must run inside the transaction
+    that creates the order. The plants are locked with one query and
+    updated with one conditional UPDATE, however many lines there are.
+    Raises InsufficientStock if the stock left after other shoppers'
+    holds can't cover a line.
+    """
+    held = {}
+    if owner is not None:
+        held = dict(
+            StockReservation.objects.select_for_update()
+            .filter(plant_id__in=quantities, **owner)
+            .values_list('plant_id', 'quantity')
+        )
+    plants = {
+        plant_id: (stock, reserved)
+        for plant_id, stock, reserved in Plant.objects.select_for_update()
+        .filter(pk__in=quantities).order_by('pk').values_list('pk', 'stock', 'reserved')
+    }
+    for plant_id, quantity in sorted(quantities.items()):
+        stock, reserved = plants.get(plant_id, (0, 0))
+        available = max(stock - reserved + held.get(plant_id, 0), 0)
+        if quantity > available:
+            raise InsufficientStock(plant_id, available)
+
+    # The WHERE clause repeats the check, so the UPDATE can never oversell
+    # even where SELECT ... FOR UPDATE is a no-op (SQLite)
+    covered = Q()
+    for plant_id, quantity in quantities.items():
+        covered |= Q(pk=plant_id, stock__gte=F('reserved') - held.get(plant_id, 0) + quantity)
+    sold = Plant.objects.filter(covered).update(
+        stock=Case(
+            *[When(pk=plant_id, then=F('stock') - quantity) for plant_id, quantity in quantities.items()],
+            output_field=IntegerField(),
+        ),
+        reserved=Case(
+            *[When(pk=plant_id, then=F('reserved') - hold) for plant_id, hold in held.items()],
+            default=F('reserved'),
+            output_field=IntegerField(),
+        ),
+    )
+    if sold != len(quantities):
+        # Only reachable if another writer changed the rows after they were
+        # read, which the row locks rule out where they're supported
+        raise InsufficientStock(min(quantities), 0)
+    if held:
+        StockReservation.objects.filter(plant_id__in=held, **owner).delete()
+    # The UPDATE bypasses the post_save handler that clears the cached
+    # in-stock counts
+    invalidate_facet_cache()
+    versions.bump('stock')
+
+def transfer(token, user):
+    """
+    Hand an anonymous shopper's holds to the account they logged in to,
+    adding to any hold the user already has on the same plant.
+    """
+    with transaction.atomic():
+        anonymous = list(StockReservation.objects.select_for_update().filter(token=token))
+        if not anonymous:
+            return
+        existing = {
+            hold.plant_id: hold
+            for hold in StockReservation.objects.select_for_update().filter(
+                user=user, plant_id__in=[hold.plant_id for hold in anonymous]
+            )
+        }
+        moved = []
+        for hold in anonymous:
+            if hold.plant_id in existing:
+                existing[hold.plant_id].quantity += hold.quantity
+                existing[hold.plant_id].expires_at = max(existing[hold.plant_id].expires_at, hold.expires_at)
+            else:
+                hold.token = None
+                hold.user = user
+                moved.append(hold)
+        StockReservation.objects.filter(token=token, plant_id__in=existing).delete()
+        StockReservation.objects.bulk_update(existing.values(), ['quantity', 'expires_at'])
+        StockReservation.objects.bulk_update(moved, ['token', 'user'])
+
+def release_expired_reservations(batch_size=500):
+    """
+    Return lapsed holds to free stock, one batch per transaction. Holds
+    another request is extending are skipped and left for the next run.
+    Returns the number of holds released.
+    """
+    released = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                StockReservation.objects.select_for_update(skip_locked=True)
+                .filter(expires_at__lt=timezone.now())
+                .order_by('id')
+                .values_list('id', 'plant_id', 'quantity')[:batch_size]
+            )
+            if not rows:
+                return released
+            _release_rows(rows)
+        released += len(rows)
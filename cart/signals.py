@@ -0,0 +1,17 @@
+from django.contrib.auth.signals import user_logged_in
+from django.dispatch import receiver
+from . import reservations
+from .storage import CART_SESSION_ID_KEY, merge_database_cart, merge_session_cart
+
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    if request is None:
+        return
+    merge_session_cart(request, user)
+    session_id = request.session.pop(CART_SESSION_ID_KEY, None)
+    if session_id:
+        merge_database_cart(session_id, user)
+    # Stock held by the anonymous cart now belongs to the account
+    token = request.session.pop(reservations.TOKEN_SESSION_KEY, None)
+    if token:
+        reservations.transfer(token, user)
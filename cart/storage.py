@@ -0,0 +1,223 @@
+"""
+Where a cart's lines are kept.
+
+Logged-in users always use CartItem rows. Anonymous shoppers use rows keyed
+by session ID, or with CART_ANONYMOUS_STORAGE = 'session' a compact
+{plant_id: quantity} entry in the session itself, which the signed-cookie
+session engine keeps entirely in the browser.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+from products.models import Plant
+from .models import CartItem
+
+SESSION_CART_KEY = 'cart'
+CART_SESSION_ID_KEY = 'cart_session_id'
+
+class DatabaseCartStorage:
+    """
+    Cart lines stored as CartItem rows, keyed by user or session ID.
+    """
+    def __init__(self, request):
+        self.session = request.session
+        self.user = request.user
+
+    def items(self):
+        """
+        Return the CartItem queryset for this cart. Visitors without a
+        session have an empty cart, and no session is created for them.
+        """
+        if self.user.is_authenticated:
+            return CartItem.objects.filter(user=self.user)
+        session_id = self.session.session_key
+        if not session_id:
+            return CartItem.objects.none()
+        return CartItem.objects.filter(session_id=session_id)
+
+    def rows(self):
+        """
+        Return (plant_id, name, price, quantity, image, stock) for every
+        line, joined with the plants in one query.
+        """
+        return self.items().order_by('date_added', 'id').values_list(
+            'plant_id', 'plant__name', 'plant__price', 'quantity', 'plant__image', 'plant__stock',
+        )
+
+    def add_many(self, quantities, override_quantity):
+        """
+        Add {plant_id: quantity} to the cart with one upsert and return the
+        resulting quantities.
+        """
+        if self.user.is_authenticated:
+            return upsert_items(quantities, override_quantity, user_id=self.user.pk)
+        if not self.session.session_key:
+            self.session.create()
+        # Logging in replaces the session key, so remember which key the
+        # rows belong to for merge_database_cart()
+        if self.session.get(CART_SESSION_ID_KEY) != self.session.session_key:
+            self.session[CART_SESSION_ID_KEY] = self.session.session_key
+        return upsert_items(quantities, override_quantity, session_id=self.session.session_key)
+
+    def remove(self, plant):
+        self.items().filter(plant=plant).delete()
+
+    def clear(self):
+        self.items().delete()
+
+class SessionCartStorage:
+    """
+    Anonymous cart lines stored in the session as {plant_id: quantity}.
+    Reading the cart costs one batched plant lookup and no writes.
+    """
+    def __init__(self, request):
+        self.session = request.session
+
+    def lines(self):
+        return self.session.get(SESSION_CART_KEY, {})
+
+    def rows(self):
+        lines = self.lines()
+        if not lines:
+            return []
+        plants = {
+            row[0]: row
+            for row in Plant.objects.filter(id__in=[int(plant_id) for plant_id in lines])
+            .values_list('id', 'name', 'price', 'image', 'stock')
+        }
+        rows = []
+        for key, quantity in lines.items():
+            # Lines for plants deleted since they were added are skipped
+            if int(key) in plants:
+                plant_id, name, price, image, stock = plants[int(key)]
+                rows.append((plant_id, name, price, quantity, image, stock))
+        return rows
+
+    def add_many(self, quantities, override_quantity):
+        lines = dict(self.lines())
+        for plant_id, quantity in quantities.items():
+            key = str(plant_id)
+            lines[key] = quantity if override_quantity else lines.get(key, 0) + quantity
+        # Like the database rows, the change is dropped if the surrounding
+        # transaction rolls back
+        transaction.on_commit(lambda: self.session.__setitem__(SESSION_CART_KEY, lines))
+        return {plant_id: lines[str(plant_id)] for plant_id in quantities}
+
+    def remove(self, plant):
+        lines = dict(self.lines())
+        if lines.pop(str(plant.id), None) is not None:
+            self.session[SESSION_CART_KEY] = lines
+
+    def clear(self):
+        self.session.pop(SESSION_CART_KEY, None)
+
+def upsert_items(quantities, override_quantity=False, user_id=None, session_id=None, batch_size=500):
+    """
+    Insert cart rows for {plant_id: quantity}, or for plants already in the
+    cart add to (or with `override_quantity`, replace) their quantity, in
+    a single INSERT ... ON CONFLICT statement per batch. The increment
+    happens in the database, so concurrent adds can't lose updates.
+    Returns the resulting {plant_id: quantity} of the written lines.
+    """
+    if not quantities:
+        return {}
+    owner = 'user_id' if user_id is not None else 'session_id'
+    table = CartItem._meta.db_table
+    if override_quantity:
+        new_quantity = 'excluded.quantity'
+    else:
+        new_quantity = f'{table}.quantity + excluded.quantity'
+    now = timezone.now()
+    lines = list(quantities.items())
+    written = {}
+    with connection.cursor() as cursor:
+        for start in range(0, len(lines), batch_size):
+            batch = lines[start:start + batch_size]
+            values = ', '.join(['(%s, %s, %s, %s, %s)'] * len(batch))
+            params = []
+            for plant_id, quantity in batch:
+                params += [user_id, session_id, plant_id, quantity, now]
+            cursor.execute(
+                f'INSERT INTO {table} (user_id, session_id, plant_id, quantity, date_added) '
+                f'VALUES {values} '
+                f'ON CONFLICT ({owner}, plant_id) DO UPDATE SET quantity = {new_quantity} '
+                f'RETURNING plant_id, quantity',
+                params,
+            )
+            written.update(cursor.fetchall())
+    return written
+
+def merge_database_cart(session_id, user):
+    """
+    Move an anonymous shopper's session-keyed CartItem rows to their
+    account in three statements, however many lines there are: plants
+    already in the user's cart get the quantities summed (capped at stock,
+    but never below what the user already had), other in-stock lines are
+    re-keyed to the user, and whatever is left is deleted.
+    Returns the number of anonymous lines merged.
+    """
+    anonymous = CartItem.objects.filter(session_id=session_id, user__isnull=True)
+    user_plants = CartItem.objects.filter(user=user).values('plant_id')
+    stock = Plant.objects.filter(pk=OuterRef('plant_id')).values('stock')
+    with transaction.atomic():
+        summed = CartItem.objects.filter(user=user, plant_id__in=anonymous.values('plant_id')).update(
+            quantity=Greatest(
+                F('quantity'),
+                Least(F('quantity') + Subquery(anonymous.filter(plant_id=OuterRef('plant_id')).values('quantity')), Subquery(stock)),
+            )
+        )
+        moved = anonymous.exclude(plant_id__in=user_plants).filter(plant__stock__gt=0).update(
+            user=user,
+            session_id=None,
+            quantity=Least(F('quantity'), Subquery(stock)),
+        )
+        anonymous.delete()
+    return summed + moved
+
+def get_storage(request):
+    if not request.user.is_authenticated and settings.CART_ANONYMOUS_STORAGE == 'session':
+        return SessionCartStorage(request)
+    return DatabaseCartStorage(request)
+
+def merge_session_cart(request, user):
+    """
+    Move a session-stored cart into the user's CartItem rows with the same
+    rules as merge_database_cart(): plants already in their cart get the
+    quantities summed (capped at stock, but never below what the user
+    already had) in one UPDATE, and other in-stock lines are added, capped
+    at stock, with one upsert.
+    Returns the number of session lines merged.
+    """
+    lines = request.session.pop(SESSION_CART_KEY, None)
+    if not lines:
+        return 0
+    quantities = {int(plant_id): quantity for plant_id, quantity in lines.items()}
+    stock = dict(Plant.objects.filter(id__in=quantities).values_list('id', 'stock'))
+    if not stock:
+        return 0
+    with transaction.atomic():
+        existing = CartItem.objects.filter(user=user, plant_id__in=stock)
+        summed = existing.update(
+            quantity=Greatest(
+                F('quantity'),
+                Least(
+                    F('quantity') + Case(
+                        *[When(plant_id=plant_id, then=Value(quantities[plant_id])) for plant_id in stock],
+                        output_field=IntegerField(),
+                    ),
+                    Subquery(Plant.objects.filter(pk=OuterRef('plant_id')).values('stock')),
+                ),
+            )
+        )
+        in_cart = set(existing.values_list('plant_id', flat=True))
+        added = upsert_items(
+            {
+                plant_id: min(quantities[plant_id], plant_stock)
+                for plant_id, plant_stock in stock.items()
+                if plant_id not in in_cart and plant_stock > 0
+            },
+            user_id=user.pk,
+        )
+    return summed + len(added)
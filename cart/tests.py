@@ -1,3 +1,191 @@
-from django.test import TestCase
+import datetime
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import OperationalError, close_old_connections, connections
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from products.facets import UNFILTERED_CACHE_KEY, clean_filters, filter_q
+from products.models import Category, Plant
+from . import reservations
+from .models import CartItem, StockReservation
+from .storage import SESSION_CART_KEY, merge_session_cart
 
 # Create your tests here.
+
+class StockReservationTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Ferns')
+        self.plant = Plant.objects.create(name='Boston Fern', category=category, price='12.00', description='x', stock=5)
+
+    def test_reserve_holds_stock_and_refuses_more_than_is_free(self):
+        reservations.reserve({'token': 'a'}, {self.plant.id: 3})
+        with self.assertRaises(reservations.InsufficientStock) as raised:
+            reservations.reserve({'token': 'b'}, {self.plant.id: 3})
+        self.assertEqual(raised.exception.available, 2)
+        self.plant.refresh_from_db()
+        self.assertEqual(self.plant.reserved, 3)
+
+    def test_changing_a_hold_only_moves_the_difference(self):
+        reservations.reserve({'token': 'a'}, {self.plant.id: 3})
+        reservations.reserve({'token': 'a'}, {self.plant.id: 5})
+        reservations.reserve({'token': 'a'}, {self.plant.id: 1})
+        self.plant.refresh_from_db()
+        self.assertEqual(self.plant.reserved, 1)
+        self.assertEqual(StockReservation.objects.get().quantity, 1)
+
+    def test_consume_uses_own_hold_but_not_other_holds(self):
+        reservations.reserve({'token': 'a'}, {self.plant.id: 2})
+        reservations.reserve({'token': 'b'}, {self.plant.id: 3})
+        reservations.consume({'token': 'a'}, {self.plant.id: 2})
+        with self.assertRaises(reservations.InsufficientStock):
+            reservations.consume(None, {self.plant.id: 1})
+        self.plant.refresh_from_db()
+        self.assertEqual((self.plant.stock, self.plant.reserved), (3, 3))
+
+    def test_negative_quantities_cannot_release_other_holds(self):
+        reservations.reserve({'token': 'a'}, {self.plant.id: 1})
+        reservations.reserve({'token': 'b'}, {self.plant.id: 3})
+        with self.assertRaises(ValueError):
+            reservations.reserve({'token': 'a'}, {self.plant.id: -4})
+        reservations.reserve({'token': 'a'}, {self.plant.id: 0})
+        self.plant.refresh_from_db()
+        self.assertEqual(self.plant.reserved, 3)
+        self.assertEqual(StockReservation.objects.get().quantity, 3)
+
+    def test_cart_views_reject_invalid_quantities(self):
+        reservations.reserve({'token': 'b'}, {self.plant.id: 3})
+        json = {'HTTP_ACCEPT': 'application/json'}
+        for url, quantity in [
+            (reverse('cart:add_to_cart', args=[self.plant.id]), '-3'),
+            (reverse('cart:add_to_cart', args=[self.plant.id]), '0'),
+            (reverse('cart:cart_update', args=[self.plant.id]), '-3'),
+            (reverse('cart:cart_update', args=[self.plant.id]), 'many'),
+        ]:
+            response = self.client.post(url, {'quantity': quantity}, **json)
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            reverse('cart:cart_add_many'), {'plant_id': [self.plant.id], 'quantity': ['-3']}, **json,
+        )
+        self.assertEqual(response.status_code, 400)
+        self.plant.refresh_from_db()
+        self.assertEqual(self.plant.reserved, 3)
+
+    def test_consume_clears_cached_facet_counts(self):
+        cache.set(UNFILTERED_CACHE_KEY, {'in_stock': 1})
+        reservations.consume(None, {self.plant.id: 5})
+        self.assertIsNone(cache.get(UNFILTERED_CACHE_KEY))
+
+    def test_fully_held_plants_are_out_of_stock(self):
+        cache.set(UNFILTERED_CACHE_KEY, {'in_stock': 1})
+        reservations.reserve({'token': 'a'}, {self.plant.id: 5})
+        self.assertIsNone(cache.get(UNFILTERED_CACHE_KEY))
+        self.assertFalse(Plant.objects.filter(filter_q(clean_filters(in_stock='1'))).exists())
+        self.plant.refresh_from_db()
+        self.assertEqual(self.plant.available_stock, 0)
+
+        reservations.release({'token': 'a'})
+        self.assertTrue(Plant.objects.filter(filter_q(clean_filters(in_stock='1'))).exists())
+
+    def test_expired_holds_are_released(self):
+        reservations.reserve({'token': 'a'}, {self.plant.id: 4})
+        StockReservation.objects.update(expires_at=timezone.now() - datetime.timedelta(minutes=1))
+        self.assertEqual(reservations.release_expired_reservations(batch_size=1), 1)
+        self.plant.refresh_from_db()
+        self.assertEqual(self.plant.reserved, 0)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_saving_a_stale_plant_keeps_the_reserved_count(self):
+        stale = Plant.objects.get(pk=self.plant.pk)
+        reservations.reserve({'token': 'a'}, {self.plant.id: 2})
+        stale.name = 'Sword Fern'
+        stale.save()
+        self.plant.refresh_from_db()
+        self.assertEqual(self.plant.reserved, 2)
+
+    def test_login_transfers_holds_to_the_user(self):
+        user = User.objects.create_user('shopper')
+        reservations.reserve({'user': user}, {self.plant.id: 1})
+        reservations.reserve({'token': 'a'}, {self.plant.id: 2})
+        reservations.transfer('a', user)
+        self.assertEqual(StockReservation.objects.get().quantity, 3)
+        self.plant.refresh_from_db()
+        self.assertEqual(self.plant.reserved, 3)
+
+class SessionCartMergeTests(TestCase):
+    def test_merge_caps_quantities_at_stock(self):
+        category = Category.objects.create(name='Palms')
+        held, new, sold_out = Plant.objects.bulk_create([
+            Plant(name=name, category=category, price='10.00', description='x', stock=stock)
+            for name, stock in [('Kentia', 5), ('Areca', 3), ('Parlour', 0)]
+        ])
+        user = User.objects.create_user('shopper')
+        CartItem.objects.create(user=user, plant=held, quantity=4)
+        request = SimpleNamespace(session={SESSION_CART_KEY: {str(held.id): 2, str(new.id): 9, str(sold_out.id): 1}})
+        self.assertEqual(merge_session_cart(request, user), 2)
+        self.assertEqual(
+            dict(CartItem.objects.filter(user=user).values_list('plant_id', 'quantity')),
+            {held.id: 5, new.id: 3},
+        )
+
+# Sessions live in signed cookies, so the cart line and the hold are the
+# only writes a request makes
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+class ConcurrentReservationTests(TransactionTestCase):
+    STOCK = 50
+    SHOPPERS = 300
+    MAX_ATTEMPTS = 1000
+
+    def test_simultaneous_adds_never_oversell(self):
+        category = Category.objects.create(name='Cacti')
+        plant = Plant.objects.create(name='Barrel Cactus', category=category, price='8.00', description='x', stock=self.STOCK)
+        users = User.objects.bulk_create([User(username=f'shopper-{i}') for i in range(self.SHOPPERS)])
+        clients = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+        workers = 16
+        start = threading.Barrier(workers)
+
+        def add_to_cart(shopper):
+            close_old_connections()
+            try:
+                if shopper < workers:
+                    start.wait()
+                return self._add(clients[shopper], plant)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(add_to_cart, range(self.SHOPPERS)))
+
+        plant.refresh_from_db()
+        self.assertEqual(sum(results), self.STOCK)
+        self.assertEqual(plant.reserved, self.STOCK)
+        self.assertEqual(StockReservation.objects.filter(plant=plant).count(), self.STOCK)
+        self.assertEqual(CartItem.objects.filter(plant=plant).count(), self.STOCK)
+
+    def _add(self, client, plant):
+        # SQLite allows one writer at a time and reports a conflicting
+        # write as an error instead of waiting, so the shopper tries again
+        # the way a retried request would; PostgreSQL waits on the row lock.
+        # Setting the line to 1 (rather than adding 1) makes a retry of a
+        # request that did commit harmless.
+        url = reverse('cart:cart_update', args=[plant.id])
+        for attempt in itertools.count():
+            try:
+                response = client.post(url, {'quantity': 1}, HTTP_ACCEPT='application/json')
+            except OperationalError as e:
+                if 'locked' not in str(e) or attempt >= self.MAX_ATTEMPTS:
+                    raise
+                time.sleep(random.uniform(0, 0.002) * min(attempt + 1, 20))
+                continue
+            self.assertIn(response.status_code, (200, 409))
+            return response.status_code == 200
@@ -1,31 +1,128 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_POST
 from django.contrib import messages
+from django.http import JsonResponse
+from django.utils.translation import ngettext
 from products.models import Plant
 from .cart import Cart
+from .reservations import InsufficientStock
 from .models import CartItem
 
 # Create your views here.
 
+def _wants_json(request):
+    """
+    True for in-page requests (fetch/XHR asking for JSON), which get the
+    updated cart back instead of a redirect.
+    """
+    return (
+        'application/json' in request.headers.get('Accept', '')
+        or request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    )
+
+def _cart_json(request, plant_ids=(), error=None, status=200):
+    """
+    Return the changed lines, totals and badge count as JSON. A changed
+    line that's no longer in the cart comes back with quantity 0.
+    """
+    snapshot = Cart(request).snapshot()
+    lines = {line.plant_id: line for line in snapshot}
+    data = {
+        'lines': [
+            lines[plant_id]._asdict() if plant_id in lines else {'plant_id': plant_id, 'quantity': 0}
+            for plant_id in plant_ids
+        ],
+        'line_count': len(snapshot),
+        'item_count': snapshot.item_count,
+        'subtotal': snapshot.subtotal,
+        'shipping_cost': snapshot.shipping_cost,
+        'total': snapshot.total,
+    }
+    if error:
+        data['error'] = error
+    return JsonResponse(data, status=status)
+
+def _cart_error(request, error, plant_ids=(), status=400):
+    if _wants_json(request):
+        return _cart_json(request, plant_ids, error=error, status=status)
+    messages.error(request, error)
+    return redirect('cart:cart_detail')
+
+def _parse_quantity(value, minimum):
+    """
+    Return `value` as an int, or None if it isn't a whole number of at
+    least `minimum`.
+    """
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        return None
+    return quantity if quantity >= minimum else None
+
 @require_POST
 def cart_add(request, product_id):
     """
     Add a product to the cart
     """
     product = get_object_or_404(Plant, id=product_id)
-    quantity = int(request.POST.get('quantity', 1))
-    
-    # Check if there's enough stock
-    if quantity > product.stock:
-        messages.error(request, f"Sorry, we only have {product.stock} of this plant in stock.")
-        return redirect(product.get_absolute_url())
+    quantity = _parse_quantity(request.POST.get('quantity', 1), minimum=1)
+    if quantity is None:
+        return _cart_error(request, "Please enter a quantity of at least 1.", plant_ids=[product.id])
     
+    # Adding holds the stock, which fails if other carts already hold it
     cart = Cart(request)
-    cart.add(product, quantity=quantity)
+    try:
+        cart.add(product, quantity=quantity)
+    except InsufficientStock as e:
+        error = f"Sorry, we only have {e.available} of this plant available."
+        if _wants_json(request):
+            return _cart_json(request, [product.id], error=error, status=409)
+        messages.error(request, error)
+        return redirect(product.get_absolute_url())
     
+    if _wants_json(request):
+        return _cart_json(request, [product.id])
     messages.success(request, f"{product.name} added to your cart.")
     return redirect('cart:cart_detail')
 
+@require_POST
+def cart_add_many(request):
+    """
+    Add or update several products at once from parallel `plant_id` and
+    `quantity` fields. All lines are written together or not at all.
+    """
+    override_quantity = bool(request.POST.get('override'))
+    quantities = {}
+    for plant_id, quantity in zip(request.POST.getlist('plant_id'), request.POST.getlist('quantity')):
+        quantity = _parse_quantity(quantity, minimum=0)
+        if quantity is None or not plant_id.isdigit():
+            return _cart_error(request, "Sorry, some of those quantities weren't valid.")
+        quantities[int(plant_id)] = quantities.get(int(plant_id), 0) + quantity
+    quantities = {plant_id: quantity for plant_id, quantity in quantities.items() if quantity > 0}
+    if not quantities:
+        return _cart_error(request, "Please choose at least one plant to add.")
+    
+    # Check every plant exists with one query
+    names = dict(Plant.objects.filter(id__in=quantities, available=True).values_list('id', 'name'))
+    if len(names) < len(quantities):
+        return _cart_error(request, "Sorry, one of those plants is no longer available.")
+    
+    # Stock is held for every line or for none of them
+    try:
+        Cart(request).add_many(quantities, override_quantity=override_quantity)
+    except InsufficientStock as e:
+        return _cart_error(
+            request, f"Sorry, we only have {e.available} of {names[e.plant_id]} available.",
+            plant_ids=list(quantities), status=409,
+        )
+    
+    if _wants_json(request):
+        return _cart_json(request, list(quantities))
+    messages.success(request, ngettext(
+        "%(count)d plant added to your cart.", "%(count)d plants added to your cart.", len(quantities),
+    ) % {'count': len(quantities)})
+    return redirect('cart:cart_detail')
+
 def cart_remove(request, product_id):
     """
     Remove a product from the cart
@@ -34,6 +131,8 @@ def cart_remove(request, product_id):
     cart = Cart(request)
     cart.remove(product)
     
+    if _wants_json(request):
+        return _cart_json(request, [product.id])
     messages.success(request, f"{product.name} removed from your cart.")
     return redirect('cart:cart_detail')
 
@@ -43,16 +142,24 @@ def cart_update(request, product_id):
     Update the quantity of a product in the cart
     """
     product = get_object_or_404(Plant, id=product_id)
-    quantity = int(request.POST.get('quantity', 1))
-    
-    # Check if there's enough stock
-    if quantity > product.stock:
-        messages.error(request, f"Sorry, we only have {product.stock} of this plant in stock.")
-        return redirect('cart:cart_detail')
+    quantity = _parse_quantity(request.POST.get('quantity', 1), minimum=0)
+    if quantity is None:
+        return _cart_error(request, "Please enter a quantity of 0 or more.", plant_ids=[product.id])
     
     cart = Cart(request)
-    cart.add(product, quantity=quantity, override_quantity=True)
+    try:
+        if quantity == 0:
+            cart.remove(product)
+        else:
+            cart.add(product, quantity=quantity, override_quantity=True)
+    except InsufficientStock as e:
+        return _cart_error(
+            request, f"Sorry, we only have {e.available} of this plant available.",
+            plant_ids=[product.id], status=409,
+        )
     
+    if _wants_json(request):
+        return _cart_json(request, [product.id])
     messages.success(request, f"{product.name} quantity updated.")
     return redirect('cart:cart_detail')
 
@@ -60,21 +167,13 @@ def cart_detail(request):
     """
     Display the cart contents
     """
-    cart = Cart(request)
-    cart_items = list(cart)
-    
-    # Calculate cart totals
-    subtotal = sum(item['total_price'] for item in cart_items)
-    
-    # Shipping cost calculation (free shipping over €50)
-    shipping_cost = 0 if subtotal >= 50 else 5
-    total = subtotal + shipping_cost
+    snapshot = Cart(request).snapshot()
     
     context = {
-        'cart_items': cart_items,
-        'subtotal': subtotal,
-        'shipping_cost': shipping_cost,
-        'total': total,
+        'cart_items': snapshot.items,
+        'subtotal': snapshot.subtotal,
+        'shipping_cost': snapshot.shipping_cost,
+        'total': snapshot.total,
     }
     
     return render(request, 'cart/cart_detail.html', context)
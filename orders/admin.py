@@ -1,5 +1,40 @@
-from django.contrib import admin
-from .models import Order, OrderItem
+import json
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.translation import ngettext
+from . import export
+from .models import Order, OrderItem, OrderNotification
+from .transitions import NOTIFY_STATUSES, transition_orders
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that takes the row count from the query planner's estimate
+    on PostgreSQL instead of running COUNT(*), which reads every matching
+    row. Small results, where the estimate is least reliable and an exact
+    count is cheap, are still counted.
+    """
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return super().count
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = int(plan[0]['Plan']['Plan Rows'])
+        if estimate < self.exact_count_limit:
+            return super().count
+        return estimate
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -8,11 +43,18 @@ class OrderItemInline(admin.TabularInline):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ['id', 'first_name', 'last_name', 'email', 'county', 
-                    'status', 'created', 'updated', 'total_price']
+    list_display = ['id', 'first_name', 'last_name', 'email', 'county',
+                    'status', 'payment_status', 'created', 'updated', 'total_price']
     list_filter = ['status', 'created', 'updated', 'county']
-    search_fields = ['first_name', 'last_name', 'email', 'address_line1', 'eircode']
-    date_hierarchy = 'created'
+    list_select_related = ['payment']
+    # Prefix matches only, so the searches can use the indexes added in
+    # migration 0005_order_admin_indexes
+    search_fields = ['^email', '^last_name', '^first_name', '^eircode']
+    search_help_text = 'Search by the start of an email, name or Eircode'
+    paginator = EstimatedCountPaginator
+    # Skip the second COUNT(*) of the whole table on filtered pages
+    show_full_result_count = False
+    raw_id_fields = ['user']
     inlines = [OrderItemInline]
     fieldsets = (
         ('Customer Information', {
@@ -26,3 +68,69 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     )
     readonly_fields = ['created', 'updated']
+    actions = ['mark_processing', 'mark_shipped', 'mark_delivered', 'mark_cancelled', 'export_csv', 'export_ndjson']
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # The form's clean() has already checked the transition is allowed
+        if change and 'status' in form.changed_data and obj.status in NOTIFY_STATUSES:
+            OrderNotification.objects.create(order=obj, status=obj.status)
+
+    def _transition(self, request, queryset, status):
+        skipped = queryset.exclude(status__in=Order.sources_for(status)).count()
+        changed = transition_orders(queryset, status)
+        self.message_user(
+            request,
+            ngettext(
+                '%(count)d order marked as %(status)s.', '%(count)d orders marked as %(status)s.', changed,
+            ) % {'count': changed, 'status': status},
+            messages.SUCCESS,
+        )
+        if skipped:
+            self.message_user(
+                request,
+                ngettext(
+                    '%(count)d order was left unchanged because its status does not allow it.',
+                    '%(count)d orders were left unchanged because their status does not allow it.',
+                    skipped,
+                ) % {'count': skipped},
+                messages.WARNING,
+            )
+
+    @admin.action(description='Mark selected orders as processing')
+    def mark_processing(self, request, queryset):
+        self._transition(request, queryset, 'processing')
+
+    @admin.action(description='Mark selected orders as shipped')
+    def mark_shipped(self, request, queryset):
+        self._transition(request, queryset, 'shipped')
+
+    @admin.action(description='Mark selected orders as delivered')
+    def mark_delivered(self, request, queryset):
+        self._transition(request, queryset, 'delivered')
+
+    @admin.action(description='Cancel selected orders')
+    def mark_cancelled(self, request, queryset):
+        self._transition(request, queryset, 'cancelled')
+
+    def _export_response(self, queryset, format):
+        response = StreamingHttpResponse(export.export(queryset, format), content_type=export.FORMATS[format])
+        filename = f'orders-{timezone.localdate().isoformat()}.{format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @admin.action(description='Export selected orders with items (CSV)')
+    def export_csv(self, request, queryset):
+        return self._export_response(queryset, 'csv')
+
+    @admin.action(description='Export selected orders with items (NDJSON)')
+    def export_ndjson(self, request, queryset):
+        return self._export_response(queryset, 'ndjson')
+
+    def payment_status(self, obj):
+        try:
+            return obj.payment.get_status_display()
+        except Order.payment.RelatedObjectDoesNotExist:
+            return '-'
+
+    payment_status.short_description = 'Payment'
@@ -0,0 +1,101 @@
+"""
+Streaming order exports for fulfillment.
+
+Orders are read with .values().iterator() and their items fetched with
+one query per chunk of orders, so an export of any size runs in
+constant memory and the first bytes go out before the last order has
+been read.
+"""
+import csv
+import datetime
+from itertools import islice
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from .models import Order, OrderItem
+from .reports import SALE_STATUSES
+
+EXPORT_CHUNK_SIZE = 2000
+
+ORDER_FIELDS = [
+    'id', 'created', 'status', 'first_name', 'last_name', 'email', 'phone',
+    'address_line1', 'address_line2', 'town_or_city', 'county', 'eircode', 'total_price',
+]
+
+ITEM_FIELDS = ['plant_id', 'plant_name', 'price', 'quantity']
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+def paid_orders(start, end):
+    """
+    Paid, uncancelled orders created from `start` to `end` (dates, inclusive).
+    """
+    tz = timezone.get_current_timezone()
+    return Order.objects.filter(
+        status__in=SALE_STATUSES,
+        created__gte=datetime.datetime.combine(start, datetime.time.min, tzinfo=tz),
+        created__lt=datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min, tzinfo=tz),
+    )
+
+def orders_with_items(orders, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield (order, items) pairs as dicts, in id order. Items are loaded
+    with one query per `chunk_size` orders rather than one per order.
+    """
+    rows = orders.order_by('id').values(*ORDER_FIELDS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        items = {}
+        for order_id, *values in (
+            OrderItem.objects.filter(order_id__in=[order['id'] for order in chunk])
+            .order_by('order_id', 'id')
+            .values_list('order_id', 'plant_id', 'plant__name', 'price', 'quantity')
+        ):
+            items.setdefault(order_id, []).append(dict(zip(ITEM_FIELDS, values)))
+        for order in chunk:
+            yield order, items.get(order['id'], [])
+
+class _Echo:
+    """
+    File-like object whose write() hands the line back to csv.writer's
+    caller instead of buffering it.
+    """
+    def write(self, value):
+        return value
+
+def export_csv(orders, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield CSV lines with one row per order item, the order's columns
+    repeated on each. An order without items gets one row with the item
+    columns left empty.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(ORDER_FIELDS + ITEM_FIELDS)
+    for order, items in orders_with_items(orders, chunk_size):
+        columns = [order[field] for field in ORDER_FIELDS]
+        columns[ORDER_FIELDS.index('created')] = order['created'].isoformat()
+        if not items:
+            yield writer.writerow(columns + [''] * len(ITEM_FIELDS))
+        for item in items:
+            yield writer.writerow(columns + [item[field] for field in ITEM_FIELDS])
+
+def export_ndjson(orders, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield one JSON object per order, with its items nested.
+    """
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for order, items in orders_with_items(orders, chunk_size):
+        order['items'] = items
+        yield encoder.encode(order) + '\n'
+
+def export(orders, format, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Stream `orders` in `format` ('csv' or 'ndjson').
+    """
+    if format == 'csv':
+        return export_csv(orders, chunk_size)
+    return export_ndjson(orders, chunk_size)
@@ -3,6 +3,9 @@ from .models import Order
 from eircode_pkg import EircodeValidator
 
 class OrderCreateForm(forms.ModelForm):
+    # Generated when the checkout page is rendered and posted back with it
+    idempotency_key = forms.CharField(max_length=64, required=False, widget=forms.HiddenInput)
+    
     class Meta:
         model = Order
         fields = ['first_name', 'last_name', 'email', 'phone',
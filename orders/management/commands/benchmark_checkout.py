@@ -0,0 +1,74 @@
+import time
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from cart import reservations
+from cart.cart import CartLine
+from orders.models import Order
+from orders.utils import place_order
+from products.models import Category, Plant
+
+class Command(BaseCommand):
+    help = 'Measures checkout latency for carts of different sizes (all changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1, 10, 30, 100],
+            help='Cart sizes (lines) to measure',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=5,
+            help='Number of checkouts timed per size',
+        )
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            timings = []
+            for _ in range(options['rounds']):
+                elapsed, queries = self._measure(size)
+                timings.append(elapsed)
+            timings.sort()
+            median = timings[len(timings) // 2]
+            self.stdout.write(
+                f'{size} lines: median {median * 1000:.1f}ms, best {timings[0] * 1000:.1f}ms '
+                f'({queries} queries)'
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark data rolled back'))
+
+    def _measure(self, size):
+        """
+        Build a cart of `size` lines with stock held for half of them, time
+        one checkout and roll everything back.
+        """
+        with transaction.atomic():
+            category = Category.objects.create(name='Checkout benchmark')
+            plants = Plant.objects.bulk_create([
+                Plant(name=f'Benchmark plant {i}', category=category, price=10, description='', stock=5)
+                for i in range(size)
+            ])
+            user = User.objects.create(username=f'checkout-benchmark-{time.time_ns()}')
+            owner = {'user': user}
+            reservations.reserve(owner, {plant.id: 2 for plant in plants[::2]})
+            lines = [
+                CartLine(plant.id, plant.name, plant.price, 2, plant.price * 2, None, plant.stock)
+                for plant in plants
+            ]
+            order = Order(
+                user=user, first_name='Bench', last_name='Mark', email='bench@example.com',
+                phone='0', address_line1='1 Main Street', town_or_city='Dublin', county='dublin',
+                total_price=sum((line.total_price for line in lines), Decimal('0')),
+            )
+
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                place_order(order, lines, owner)
+                elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        return elapsed, len(queries)
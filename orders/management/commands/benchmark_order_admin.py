@@ -0,0 +1,118 @@
+import datetime
+import random
+import time
+from importlib import import_module
+from urllib.parse import quote
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from orders.models import Order
+
+# Changelist query strings timed against the synthetic orders
+SCENARIOS = [
+    '',
+    'status__exact=shipped',
+    'county__exact=cork&status__exact=pending',
+    'created__gte={week_ago}',
+    'q=customer42',
+    'q=d02',
+    'p=50',
+]
+
+class Command(BaseCommand):
+    help = 'Measures order admin changelist latency against synthetic orders (all changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--orders',
+            type=int,
+            default=1000000,
+            help='Number of synthetic orders to create',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=3,
+            help='Number of requests timed per changelist URL',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Orders inserted per statement while building the data',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            start = time.monotonic()
+            self._create_orders(options['orders'], options['batch_size'])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE orders_order')
+            self.stdout.write(f'Created {options["orders"]} orders in {time.monotonic() - start:.0f}s')
+
+            user = User.objects.create(username=f'order-admin-benchmark-{time.time_ns()}', is_staff=True, is_superuser=True)
+            week_ago = quote((timezone.now() - datetime.timedelta(days=7)).replace(microsecond=0).isoformat())
+            for scenario in SCENARIOS:
+                query = scenario.format(week_ago=week_ago)
+                timings = []
+                for _ in range(options['rounds']):
+                    elapsed, queries = self._measure(user, query)
+                    timings.append(elapsed)
+                timings.sort()
+                self.stdout.write(
+                    f'?{query}: median {timings[len(timings) // 2] * 1000:.1f}ms, '
+                    f'best {timings[0] * 1000:.1f}ms ({queries} queries)'
+                )
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('Benchmark data rolled back'))
+
+    def _create_orders(self, count, batch_size):
+        """
+        Insert `count` orders with a realistic mix of statuses and
+        counties, created at random times over the last three years.
+        """
+        rng = random.Random(0)
+        counties = [code for code, name in Order.COUNTY_CHOICES]
+        statuses = ['delivered'] * 6 + ['shipped', 'processing', 'pending', 'cancelled']
+        for low in range(0, count, batch_size):
+            Order.objects.bulk_create([
+                Order(
+                    first_name=f'First{i % 5000}', last_name=f'Last{i % 20000}',
+                    email=f'customer{i}@example.com', phone='0871234567',
+                    address_line1=f'{i % 300} Main Street', town_or_city='Town',
+                    county=rng.choice(counties), eircode=f'D{i % 100:02d} X{i % 1000:03d}',
+                    status=rng.choice(statuses), total_price=rng.randrange(500, 20000) / 100,
+                )
+                for i in range(low, min(low + batch_size, count))
+            ])
+
+        # bulk_create stamps every order with the current time
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    "UPDATE orders_order SET created = %s - random() * interval '1095 days'", [now]
+                )
+            elif connection.vendor == 'sqlite':
+                cursor.execute(
+                    "UPDATE orders_order SET created = "
+                    "datetime(%s, '-' || (abs(random()) %% 94608000) || ' seconds')",
+                    [now.strftime('%Y-%m-%d %H:%M:%S')],
+                )
+
+    def _measure(self, user, query):
+        request = RequestFactory().get(f'/admin/orders/order/?{query}')
+        request.user = user
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+        model_admin = admin.site._registry[Order]
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = model_admin.changelist_view(request)
+            response.render()
+            elapsed = time.perf_counter() - start
+        return elapsed, len(queries)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from orders.transitions import MAX_ATTEMPTS, send_notifications
+
+class Command(BaseCommand):
+    help = 'Emails customers about queued order status changes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Notifications sent per transaction',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=MAX_ATTEMPTS,
+            help='Give up on a notification after this many failed sends',
+        )
+
+    def handle(self, *args, **options):
+        sent, failed = send_notifications(batch_size=options['batch_size'], max_attempts=options['max_attempts'])
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} order notifications ({failed} failed)'))
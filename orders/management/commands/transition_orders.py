@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from orders.models import Order
+from orders.transitions import transition_orders
+
+class Command(BaseCommand):
+    help = 'Moves orders to a new status in bulk, skipping orders whose current status does not allow it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'status',
+            choices=[status for status in Order.TRANSITIONS if Order.sources_for(status)],
+            help='Status to move the orders to',
+        )
+        parser.add_argument(
+            '--ids',
+            type=int,
+            nargs='+',
+            default=[],
+            help='IDs of the orders to move',
+        )
+        parser.add_argument(
+            '--ids-file',
+            help='File with one order ID per line, e.g. from a fulfillment partner',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Orders updated per transaction',
+        )
+
+    def handle(self, *args, **options):
+        ids = set(options['ids'])
+        if options['ids_file']:
+            with open(options['ids_file']) as f:
+                try:
+                    ids.update(int(line) for line in f if line.strip())
+                except ValueError as e:
+                    raise CommandError(f'Invalid order ID in {options["ids_file"]}: {e}')
+        if not ids:
+            raise CommandError('Give the orders to move with --ids or --ids-file')
+
+        # Split the IDs so no statement carries more than a batch of them
+        ids = sorted(ids)
+        batch_size = options['batch_size']
+        changed = 0
+        for i in range(0, len(ids), batch_size):
+            changed += transition_orders(
+                Order.objects.filter(id__in=ids[i:i + batch_size]), options['status'], batch_size,
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Marked {changed} of {len(ids)} orders as {options["status"]}'
+        ))
@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from orders.reports import update_sales_rollups
+
+class Command(BaseCommand):
+    help = 'Refreshes the daily sales rollups for orders created or changed since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild the rollups from every order instead of only orders changed since the last run',
+        )
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        orders, days = update_sales_rollups(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {orders} orders and rebuilt {days} days of sales rollups in {time.monotonic() - start:.1f}s'
+        ))
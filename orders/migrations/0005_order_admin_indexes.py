@@ -0,0 +1,52 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:50
+
+from django.db import migrations, models
+
+# Columns the order admin searches by prefix
+SEARCH_COLUMNS = ['email', 'last_name', 'first_name', 'eircode']
+
+
+def create_search_indexes(apps, schema_editor):
+    """
+    Index the searched columns the way Django compares them for
+    istartswith, so prefix searches don't scan the table.
+    """
+    vendor = schema_editor.connection.vendor
+    for column in SEARCH_COLUMNS:
+        if vendor == 'sqlite':
+            schema_editor.execute(
+                f"CREATE INDEX order_{column}_prefix_idx ON orders_order ({column} COLLATE NOCASE)"
+            )
+        elif vendor == 'postgresql':
+            schema_editor.execute(
+                f"CREATE INDEX order_{column}_prefix_idx ON orders_order (UPPER({column}::text) text_pattern_ops)"
+            )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        for column in SEARCH_COLUMNS:
+            schema_editor.execute(f"DROP INDEX IF EXISTS order_{column}_prefix_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created', 'id'], name='order_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created'], name='order_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['county', 'created'], name='order_county_created_idx'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
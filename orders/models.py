@@ -1,6 +1,7 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import User
-from products.models import Plant
+from products.models import Category, Plant
 
 # Create your models here.
 class Order(models.Model):
@@ -12,6 +13,15 @@ class Order(models.Model):
         ('cancelled', 'Cancelled'),
     ]
     
+    # Status -> statuses an order may move to from it
+    TRANSITIONS = {
+        'pending': ['processing', 'cancelled'],
+        'processing': ['shipped', 'cancelled'],
+        'shipped': ['delivered'],
+        'delivered': [],
+        'cancelled': [],
+    }
+    
     COUNTY_CHOICES = [
         ('antrim', 'Antrim'),
         ('armagh', 'Armagh'),
@@ -58,15 +68,50 @@ class Order(models.Model):
     county = models.CharField(max_length=50, choices=COUNTY_CHOICES)
     eircode = models.CharField(max_length=8, blank=True)
     created = models.DateTimeField(auto_now_add=True)
-    updated = models.DateTimeField(auto_now=True)
+    updated = models.DateTimeField(auto_now=True, db_index=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Sent by the checkout form so a resubmitted or retried request returns
+    # this order instead of placing another one
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True, editable=False)
     
     class Meta:
         ordering = ['-created']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='unique_order_idempotency_key'),
+        ]
+        # Match the admin changelist: newest first, optionally filtered
+        # by status or county
+        indexes = [
+            models.Index(fields=['created', 'id'], name='order_created_idx'),
+            models.Index(fields=['status', 'created'], name='order_status_created_idx'),
+            models.Index(fields=['county', 'created'], name='order_county_created_idx'),
+        ]
     
     def __str__(self):
         return f'Order {self.id} - {self.first_name} {self.last_name}'
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so edits can be checked against
+        # the allowed transitions
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
+    @classmethod
+    def sources_for(cls, status):
+        """
+        Statuses an order can move to `status` from.
+        """
+        return [source for source, targets in cls.TRANSITIONS.items() if status in targets]
+    
+    def clean(self):
+        loaded = getattr(self, '_loaded_status', None)
+        if loaded and self.status != loaded and self.status not in self.TRANSITIONS.get(loaded, []):
+            raise ValidationError({
+                'status': f'A {loaded} order cannot be marked as {self.status}.'
+            })
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
@@ -79,3 +124,76 @@ class OrderItem(models.Model):
     
     def get_total_price(self):
         return self.price * self.quantity
+
+class OrderNotification(models.Model):
+    """
+    A status update email waiting to be sent to the customer. Rows are
+    written in bulk with the status change and sent in batches by the
+    send_order_notifications command.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='notifications')
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    created = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(sent_at__isnull=True), name='order_notification_unsent_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.get_status_display()} notification for Order {self.order_id}'
+
+class SalesRollup(models.Model):
+    """
+    Sales for one day, summed over the items of paid, uncancelled orders
+    created that day. Rebuilt a day at a time by orders.reports.
+    """
+    day = models.DateField()
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    units = models.PositiveIntegerField(default=0)
+    orders = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        abstract = True
+
+class DailyPlantSales(SalesRollup):
+    plant = models.ForeignKey(Plant, on_delete=models.CASCADE, related_name='+')
+    
+    class Meta:
+        verbose_name_plural = 'Daily plant sales'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'plant'], name='unique_daily_plant_sales'),
+        ]
+
+class DailyCategorySales(SalesRollup):
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    
+    class Meta:
+        verbose_name_plural = 'Daily category sales'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category'], name='unique_daily_category_sales'),
+        ]
+
+class DailyCountySales(SalesRollup):
+    county = models.CharField(max_length=50, choices=Order.COUNTY_CHOICES)
+    
+    class Meta:
+        verbose_name_plural = 'Daily county sales'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'county'], name='unique_daily_county_sales'),
+        ]
+
+class SalesRollupWatermark(models.Model):
+    """
+    Single row recording how far order changes have been folded into the
+    sales rollups, by Order.updated.
+    """
+    last_updated = models.DateTimeField(null=True)
+    updated = models.DateTimeField(auto_now=True)
+    
+    @classmethod
+    def get(cls):
+        watermark, created = cls.objects.get_or_create(pk=1)
+        return watermark
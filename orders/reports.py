@@ -0,0 +1,137 @@
+"""
+Daily sales rollups for the staff reports.
+
+Each rollup row holds one day's revenue, units and order count for a
+plant, a category or a county. update_sales_rollups() finds the days
+touched by orders created or changed since its last run and recomputes
+only those days, so reports never aggregate OrderItem themselves.
+"""
+import datetime
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+from .models import (
+    DailyCategorySales, DailyCountySales, DailyPlantSales, Order, OrderItem, SalesRollupWatermark,
+)
+
+# Orders in these states have been paid for and not cancelled
+SALE_STATUSES = ('processing', 'shipped', 'delivered')
+
+# Orders changed more recently than this may belong to transactions that
+# haven't committed yet, so they are left for the next run
+SETTLE_DELAY = datetime.timedelta(minutes=5)
+
+# (rollup model, OrderItem field grouped on, rollup field it fills)
+ROLLUPS = (
+    (DailyPlantSales, 'plant_id', 'plant_id'),
+    (DailyCategorySales, 'plant__category_id', 'category_id'),
+    (DailyCountySales, 'order__county', 'county'),
+)
+
+# Report groupings: rollup model and the values() fields identifying a row
+GROUPS = {
+    'plant': (DailyPlantSales, ['plant_id', 'plant__name']),
+    'category': (DailyCategorySales, ['category_id', 'category__name']),
+    'county': (DailyCountySales, ['county']),
+}
+
+def _day_bounds(days):
+    """
+    Return the datetime range covering `days`, so the rebuild query can
+    use the index on Order.created before matching exact dates.
+    """
+    tz = timezone.get_current_timezone()
+    start = datetime.datetime.combine(min(days), datetime.time.min, tzinfo=tz)
+    end = datetime.datetime.combine(max(days) + datetime.timedelta(days=1), datetime.time.min, tzinfo=tz)
+    return start, end
+
+def _rebuild_days(days, batch_size=1000):
+    """
+    Replace every rollup row for `days` with fresh totals computed by one
+    grouped aggregate per rollup table.
+    """
+    start, end = _day_bounds(days)
+    items = OrderItem.objects.filter(
+        order__status__in=SALE_STATUSES,
+        order__created__gte=start,
+        order__created__lt=end,
+        order__created__date__in=days,
+    ).annotate(day=TruncDate('order__created'))
+    for model, source, field in ROLLUPS:
+        rows = (
+            items.values('day', source)
+            .order_by()
+            .annotate(
+                revenue=Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+                units=Sum('quantity'),
+                orders=Count('order_id', distinct=True),
+            )
+        )
+        model.objects.filter(day__in=days).delete()
+        model.objects.bulk_create(
+            [
+                model(day=row['day'], revenue=row['revenue'], units=row['units'], orders=row['orders'],
+                      **{field: row[source]})
+                for row in rows
+            ],
+            batch_size=batch_size,
+        )
+
+def update_sales_rollups(full=False, days_per_batch=31):
+    """
+    Recompute the rollups for every day with an order created or updated
+    since the last run (with `full`, every day with orders, after clearing
+    the tables). Orders that are deleted outright only drop out of the
+    rollups on a full rebuild.
+    Returns (orders processed, days rebuilt).
+    """
+    cutoff = timezone.now() - SETTLE_DELAY
+    with transaction.atomic():
+        watermark = SalesRollupWatermark.objects.select_for_update().get(pk=SalesRollupWatermark.get().pk)
+        changed = Order.objects.filter(updated__lt=cutoff)
+        if not full and watermark.last_updated is not None:
+            changed = changed.filter(updated__gte=watermark.last_updated)
+        days = sorted(set(
+            changed.annotate(day=TruncDate('created')).order_by().values_list('day', flat=True).distinct()
+        ))
+
+        if full:
+            for model, source, field in ROLLUPS:
+                model.objects.all().delete()
+        for i in range(0, len(days), days_per_batch):
+            _rebuild_days(days[i:i + days_per_batch])
+
+        watermark.last_updated = cutoff
+        watermark.save()
+        order_count = changed.count()
+    return order_count, len(days)
+
+def sales_report(start, end, group='plant'):
+    """
+    Summarise sales from `start` to `end` (dates, inclusive) from the
+    rollups. Returns (totals, months, rows): overall totals, totals per
+    month, and totals per plant, category or county, best sellers first.
+    """
+    model, fields = GROUPS[group]
+    totals_by_day = DailyCountySales.objects.filter(day__range=(start, end))
+    sums = {'revenue': Sum('revenue'), 'units': Sum('units'), 'orders': Sum('orders')}
+
+    totals = totals_by_day.aggregate(**sums)
+    months = list(
+        totals_by_day.annotate(month=TruncMonth('day')).values('month').order_by('month').annotate(**sums)
+    )
+    rows = list(
+        model.objects.filter(day__range=(start, end))
+        .values(*fields)
+        .annotate(**sums)
+        .order_by('-revenue', *fields)
+    )
+    if group == 'county':
+        names = dict(Order.COUNTY_CHOICES)
+        for row in rows:
+            row['name'] = names.get(row['county'], row['county'])
+    else:
+        for row in rows:
+            row['name'] = row[f'{group}__name']
+    return totals, months, rows
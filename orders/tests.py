@@ -1,3 +1,123 @@
+import csv
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from django.urls import reverse
+from payments.models import Payment
+from products.models import Category, Plant
+from .export import ITEM_FIELDS, export_csv
+from .models import Order, OrderItem, OrderNotification
+from .transitions import transition_orders
 
 # Create your tests here.
+
+class OrderHistoryQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Succulents')
+        plants = Plant.objects.bulk_create([
+            Plant(name=f'Echeveria {i}', category=category, price='8.00', description='x', stock=10)
+            for i in range(5)
+        ])
+        cls.user = User.objects.create_user('shopper', password='x')
+        orders = Order.objects.bulk_create([
+            Order(
+                user=cls.user, first_name='Ann', last_name='Lee', email='ann@example.com', phone='1',
+                address_line1='1 Main Street', town_or_city='Cork', county='cork', total_price='24.00',
+            )
+            for _ in range(1000)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, plant=plants[(order.id + offset) % 5], price='8.00', quantity=offset + 1)
+            for order in orders for offset in range(2)
+        ])
+        Payment.objects.bulk_create([
+            Payment(order=order, amount=order.total_price, method='credit_card', status='completed')
+            for order in orders[::2]
+        ])
+        cls.orders = orders
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_history_pages_take_a_fixed_number_of_queries(self):
+        with self.assertNumQueries(5):
+            first = self.client.get(reverse('orders:order_history'))
+        self.assertEqual(len(first.context['orders']), 20)
+        self.assertEqual(first.context['orders'].object_list[0].item_count, 2)
+
+        with self.assertNumQueries(5):
+            second = self.client.get(reverse('orders:order_history') + first.context['next_url'])
+        first_ids = {order.id for order in first.context['orders']}
+        second_ids = {order.id for order in second.context['orders']}
+        self.assertEqual(len(second_ids), 20)
+        self.assertFalse(first_ids & second_ids)
+
+    def test_last_history_page_has_no_next_page(self):
+        url = reverse('orders:order_history')
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            pages += 1
+            next_url = response.context['next_url']
+            url = reverse('orders:order_history') + next_url if next_url else None
+        self.assertEqual(pages, 50)
+
+    def test_detail_takes_a_fixed_number_of_queries(self):
+        for order in (self.orders[0], self.orders[1]):
+            with self.assertNumQueries(5):
+                response = self.client.get(reverse('orders:order_detail', args=[order.id]))
+            self.assertEqual(len(response.context['order'].items.all()), 2)
+
+
+class OrderTransitionTests(TestCase):
+    def setUp(self):
+        self.orders = Order.objects.bulk_create([
+            Order(
+                first_name='Ann', last_name='Lee', email='ann@example.com', phone='1',
+                address_line1='1 Main Street', town_or_city='Cork', county='cork', total_price='10.00',
+                status=status,
+            )
+            for status in ['pending', 'processing', 'processing', 'shipped', 'cancelled']
+        ])
+
+    def test_bulk_transition_only_moves_allowed_orders_and_queues_notifications(self):
+        with self.assertNumQueries(5):
+            changed = transition_orders(Order.objects.all(), 'shipped', batch_size=10)
+        self.assertEqual(changed, 2)
+        self.assertEqual(
+            list(Order.objects.order_by('id').values_list('status', flat=True)),
+            ['pending', 'shipped', 'shipped', 'shipped', 'cancelled'],
+        )
+        self.assertEqual(
+            sorted(OrderNotification.objects.values_list('order_id', flat=True)),
+            [self.orders[1].id, self.orders[2].id],
+        )
+
+    def test_statuses_without_a_way_in_are_rejected(self):
+        with self.assertRaises(ValueError):
+            transition_orders(Order.objects.all(), 'pending')
+
+    def test_clean_rejects_invalid_transitions(self):
+        order = Order.objects.get(id=self.orders[3].id)
+        order.status = 'delivered'
+        order.clean()
+        order.status = 'pending'
+        with self.assertRaises(ValidationError):
+            order.clean()
+
+class OrderExportTests(TestCase):
+    def test_csv_keeps_orders_without_items(self):
+        category = Category.objects.create(name='Ferns')
+        plant = Plant.objects.create(name='Boston Fern', category=category, price='12.00', description='x', stock=5)
+        orders = Order.objects.bulk_create([
+            Order(
+                first_name='Ann', last_name='Lee', email='ann@example.com', phone='1',
+                address_line1='1 Main Street', town_or_city='Cork', county='cork', total_price='12.00',
+            )
+            for _ in range(2)
+        ])
+        OrderItem.objects.create(order=orders[0], plant=plant, price='12.00', quantity=1)
+        rows = list(csv.reader(export_csv(Order.objects.all())))
+        self.assertEqual([row[0] for row in rows[1:]], [str(orders[0].id), str(orders[1].id)])
+        self.assertEqual(rows[2][-len(ITEM_FIELDS):], [''] * len(ITEM_FIELDS))
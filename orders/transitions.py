@@ -0,0 +1,81 @@
+"""
+Set-based order status changes.
+
+transition_orders() moves any number of orders to a new status with
+UPDATEs that only match orders whose current status allows the move
+(see Order.TRANSITIONS), and queues the customer emails for the whole
+batch with one INSERT instead of sending them inline. send_notifications()
+works through that queue.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from payments.utils import get_ses_client, send_order_status_email
+from .models import Order, OrderNotification
+
+# Sends are retried on later runs until they have failed this many times
+MAX_ATTEMPTS = 5
+
+# Statuses customers are emailed about; confirmation of a paid order
+# ('processing') is sent by the payment flow
+NOTIFY_STATUSES = ('shipped', 'delivered', 'cancelled')
+
+def transition_orders(orders, status, batch_size=1000):
+    """
+    Move the orders in `orders` that are allowed to become `status` to it,
+    `batch_size` at a time, each batch in its own transaction. Others are
+    left as they are. Returns the number of orders changed.
+    """
+    sources = Order.sources_for(status)
+    if not sources:
+        raise ValueError(f'No order can be moved to {status!r}')
+
+    eligible = orders.filter(status__in=sources).order_by('id').values_list('id', flat=True)
+    changed = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            ids = list(eligible.filter(id__gt=last_id).select_for_update()[:batch_size])
+            if not ids:
+                return changed
+            # The status guard is repeated so an order changed since it was
+            # read is never moved along an invalid transition
+            changed += Order.objects.filter(id__in=ids, status__in=sources).update(
+                status=status, updated=timezone.now(),
+            )
+            if status in NOTIFY_STATUSES:
+                OrderNotification.objects.bulk_create(
+                    [OrderNotification(order_id=order_id, status=status) for order_id in ids]
+                )
+        if len(ids) < batch_size:
+            return changed
+        last_id = ids[-1]
+
+def send_notifications(batch_size=100, max_attempts=MAX_ATTEMPTS):
+    """
+    Email customers about queued status changes, a batch at a time.
+    Notifications another run is already sending are skipped, and failed
+    sends stay queued for the next run. Returns (sent, failed).
+    """
+    ses = get_ses_client()
+    sent = failed = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                OrderNotification.objects.select_for_update(skip_locked=True, of=('self',))
+                .select_related('order')
+                .filter(sent_at__isnull=True, attempts__lt=max_attempts, id__gt=last_id)
+                .order_by('id')[:batch_size]
+            )
+            if not batch:
+                return sent, failed
+            delivered, undelivered = [], []
+            for notification in batch:
+                ok = send_order_status_email(notification.order, notification.status, ses=ses)
+                (delivered if ok else undelivered).append(notification.id)
+            OrderNotification.objects.filter(id__in=delivered).update(sent_at=timezone.now())
+            OrderNotification.objects.filter(id__in=undelivered).update(attempts=F('attempts') + 1)
+        sent += len(delivered)
+        failed += len(undelivered)
+        last_id = batch[-1].id
@@ -7,4 +7,5 @@ urlpatterns = [
     path('create/', views.order_create, name='order_create'),
     path('detail/<int:order_id>/', views.order_detail, name='order_detail'),
     path('history/', views.order_history, name='order_history'),
+    path('reports/sales/', views.sales_report, name='sales_report'),
 ]
@@ -0,0 +1,50 @@
+from django.db import IntegrityError, transaction
+from cart import reservations
+from .models import Order, OrderItem
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+def get_idempotency_key(request):
+    """
+    Return the key the client sent with a checkout request, from the form
+    or the Idempotency-Key header, or None if there isn't a usable one.
+    """
+    key = request.POST.get('idempotency_key') or request.headers.get(IDEMPOTENCY_HEADER)
+    if key and len(key) <= 64:
+        return key
+    return None
+
+def find_placed_order(user, key):
+    """
+    Return the order `user` already placed with idempotency key `key`.
+    """
+    if key is None:
+        return None
+    return Order.objects.filter(user=user, idempotency_key=key).first()
+
+def place_order(order, lines, owner):
+    """
+    Save `order` with an item for every cart line and take the stock, as
+    one transaction with a fixed number of queries whatever the cart size.
+    `lines` are CartLine tuples and `owner` identifies the cart's stock
+    holds (see cart.reservations.get_owner). Raises
+    reservations.InsufficientStock, leaving nothing saved, if a line
+    can't be covered.
+
+    If another request already placed an order with the same idempotency
+    key, nothing is saved and that order is returned instead.
+    """
+    try:
+        with transaction.atomic():
+            order.save()
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, plant_id=line.plant_id, price=line.price, quantity=line.quantity)
+                for line in lines
+            ])
+            reservations.consume(owner, {line.plant_id: line.quantity for line in lines})
+    except IntegrityError:
+        placed = find_placed_order(order.user, order.idempotency_key)
+        if placed is None:
+            raise
+        return placed
+    return order
@@ -1,17 +1,38 @@
+import datetime
+import uuid
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
+from django.db import transaction
+from django.db.models import Count, Prefetch
 from django.urls import reverse
+from django.utils import timezone
 from .models import Order, OrderItem
 from .forms import OrderCreateForm
+from . import reports
+from .utils import find_placed_order, get_idempotency_key, place_order
+from cart import reservations
 from cart.cart import Cart
-from products.models import Plant
+from products.pagination import paginate
+
+ORDERS_PER_PAGE = 20
+
+SALES_REPORT_DAYS = 365
 
 # Create your views here.
 @login_required
 def order_create(request):
+    if request.method == 'POST':
+        # A resubmitted form or a client retry returns the order it placed
+        placed = find_placed_order(request.user, get_idempotency_key(request))
+        if placed is not None:
+            request.session['order_id'] = placed.id
+            return redirect(reverse('payments:process'))
+    
     cart = Cart(request)
-    if len(cart) == 0:
+    snapshot = cart.snapshot()
+    if len(snapshot) == 0:
         messages.error(request, "Your cart is empty. Please add some plants before checking out.")
         return redirect('cart:cart_detail')
     
@@ -20,28 +41,20 @@ def order_create(request):
         if form.is_valid():
             order = form.save(commit=False)
             order.user = request.user
+            order.idempotency_key = get_idempotency_key(request)
             
             # Calculate total price from cart
-            total_price = sum(item['price'] * item['quantity'] for item in cart)
-            order.total_price = total_price
-            order.save()
-            
-            # Create order items from cart
-            for item in cart:
-                plant = get_object_or_404(Plant, id=item['plant_id'])
-                OrderItem.objects.create(
-                    order=order,
-                    plant=plant,
-                    price=item['price'],
-                    quantity=item['quantity']
-                )
-                
-                # Update plant stock
-                plant.stock -= item['quantity']
-                plant.save()
+            order.total_price = snapshot.subtotal
             
-            # Clear the cart
-            cart.clear()
+            # The order, its items, the stock and the cart change together
+            try:
+                with transaction.atomic():
+                    order = place_order(order, snapshot, reservations.get_owner(request))
+                    cart.clear()
+            except reservations.InsufficientStock as e:
+                name = next(item.name for item in snapshot if item.plant_id == e.plant_id)
+                messages.error(request, f"Sorry, we only have {e.available} of {name} available.")
+                return redirect('cart:cart_detail')
             
             # Store order ID in session for payment
             request.session['order_id'] = order.id
@@ -64,19 +77,27 @@ def order_create(request):
                 'eircode': profile.eircode,
                 'phone': profile.phone,
             }
+        initial_data['idempotency_key'] = uuid.uuid4().hex
         form = OrderCreateForm(initial=initial_data)
     
     return render(request, 'orders/create.html', {
-        'cart': cart,
+        'cart': snapshot,
         'form': form
     })
 
 @login_required
 def order_detail(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
+    order = get_object_or_404(
+        Order.objects.select_related('payment').prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('plant').only(
+                'order', 'price', 'quantity', 'plant__name'
+            ))
+        ),
+        id=order_id,
+    )
     
     # Ensure users can only view their own orders (unless staff)
-    if order.user != request.user and not request.user.is_staff:
+    if order.user_id != request.user.id and not request.user.is_staff:
         messages.error(request, "You don't have permission to view this order.")
         return redirect('accounts:dashboard')
     
@@ -86,7 +107,61 @@ def order_detail(request, order_id):
 
 @login_required
 def order_history(request):
-    orders = Order.objects.filter(user=request.user).order_by('-created')
+    """
+    One keyset page of the user's orders, newest first. Line counts are
+    annotated on the page query (totals are stored on the order), the
+    items and their plants come from one prefetch and the payment is
+    joined in.
+    """
+    orders = (
+        Order.objects.filter(user=request.user)
+        .annotate(item_count=Count('items'))
+        .select_related('payment')
+        .prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('plant').only(
+                'order', 'quantity', 'plant__name'
+            ))
+        )
+    )
+    page = paginate(orders, ['-created', '-id'], cursor=request.GET.get('cursor'), per_page=ORDERS_PER_PAGE)
+    
+    next_url = previous_url = None
+    if page.has_next():
+        next_url = f'?cursor={page.next_cursor}'
+    if page.has_previous():
+        previous_url = f'?cursor={page.previous_cursor}'
+    
     return render(request, 'orders/history.html', {
-        'orders': orders
+        'orders': page,
+        'next_url': next_url,
+        'previous_url': previous_url,
+    })
+
+def _parse_date(value, default):
+    try:
+        return datetime.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return default
+
+@staff_member_required
+def sales_report(request):
+    """
+    Sales totals for a date range (the last year by default), grouped by
+    plant, category or county, read from the daily rollups.
+    """
+    end = _parse_date(request.GET.get('end'), timezone.localdate())
+    start = _parse_date(request.GET.get('start'), end - datetime.timedelta(days=SALES_REPORT_DAYS - 1))
+    group = request.GET.get('group')
+    if group not in reports.GROUPS:
+        group = 'plant'
+    
+    totals, months, rows = reports.sales_report(start, end, group)
+    return render(request, 'orders/sales_report.html', {
+        'start': start,
+        'end': end,
+        'group': group,
+        'groups': list(reports.GROUPS),
+        'totals': totals,
+        'months': months,
+        'rows': rows,
     })
@@ -18,6 +18,10 @@ class Payment(models.Model):
     
     order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='payment')
     payment_id = models.CharField(max_length=100, blank=True)  # ID from payment processor
+    # Sent to Stripe with the Checkout session request, so a retried request
+    # gets the session Stripe already created back instead of a second one
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, editable=False)
+    checkout_url = models.URLField(max_length=1000, blank=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='pending')
     method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES)
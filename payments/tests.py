@@ -1,3 +1,26 @@
+from types import SimpleNamespace
+from unittest import mock
 from django.test import TestCase
+from django.urls import reverse
+from orders.models import Order
+from .models import Payment
 
 # Create your tests here.
+
+class PaymentCompletedTests(TestCase):
+    def test_payment_for_cancelled_order_is_not_confirmed(self):
+        order = Order.objects.create(
+            first_name='Ann', last_name='Lee', email='ann@example.com', phone='1',
+            address_line1='1 Main Street', town_or_city='Cork', county='cork', total_price='10.00',
+            status='cancelled',
+        )
+        Payment.objects.create(order=order, payment_id='cs_test', amount='10.00', method='credit_card')
+        session = SimpleNamespace(metadata=SimpleNamespace(order_id=order.id), payment_status='paid')
+        with mock.patch('stripe.checkout.Session.retrieve', return_value=session), \
+                mock.patch('payments.views.send_order_confirmation_email') as send_email, \
+                self.assertLogs('payments.views', 'ERROR'):
+            response = self.client.get(reverse('payments:completed'), {'session_id': 'cs_test'})
+        self.assertRedirects(response, reverse('orders:order_detail', args=[order.id]), fetch_redirect_response=False)
+        send_email.assert_not_called()
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'cancelled')
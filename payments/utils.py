@@ -229,3 +229,73 @@ def send_order_confirmation_email(order):
     except Exception as e:
         logger.error(f"Unexpected error sending SES email for order #{order.id}: {e}")
         return False
+
+# Subject and message for each status customers are emailed about
+ORDER_STATUS_MESSAGES = {
+    'shipped': ('Your Botanica order #{id} has shipped', "Good news! Your plants are on their way and should arrive within 3-5 business days."),
+    'delivered': ('Your Botanica order #{id} has been delivered', "Your order has been delivered. We hope your new plants settle in well!"),
+    'cancelled': ('Your Botanica order #{id} has been cancelled', "Your order has been cancelled. If you didn't expect this, please contact our customer service team."),
+}
+
+def get_ses_client():
+    """
+    Create an Amazon SES client from the SES credentials in settings.
+    """
+    return boto3.client(
+        'ses',
+        aws_access_key_id=settings.AWS_SES_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SES_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_SES_REGION
+    )
+
+def send_order_status_email(order, status, ses=None):
+    """
+    Send an order status update email using Amazon SES.
+    
+    Args:
+        order: The Order the update is about
+        status (str): The status the order moved to (a key of ORDER_STATUS_MESSAGES)
+        ses: SES client to reuse when sending a batch; one is created if omitted
+    
+    Returns:
+        bool: True if the email was sent successfully, False otherwise
+    """
+    subject, message = ORDER_STATUS_MESSAGES[status]
+    subject = subject.format(id=order.id)
+    try:
+        ses = ses or get_ses_client()
+        
+        text_body = f"Dear {order.first_name} {order.last_name},\n\n{message}\n\nOrder Number: {order.id}\n\nThank you for shopping with Botanica!\n"
+        html_body = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <p>Dear {html.escape(order.first_name)} {html.escape(order.last_name)},</p>
+            <p>{html.escape(message)}</p>
+            <p><strong>Order Number:</strong> {order.id}</p>
+            <p>Thank you for shopping with Botanica!</p>
+        </body>
+        </html>
+        """
+        
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = f"Botanica <{settings.AWS_SES_SENDER_EMAIL}>"
+        msg['To'] = order.email
+        msg.attach(MIMEText(text_body, 'plain'))
+        msg.attach(MIMEText(html_body, 'html'))
+        
+        response = ses.send_raw_email(
+            Source=msg['From'],
+            Destinations=[order.email],
+            RawMessage={'Data': msg.as_string()}
+        )
+        
+        logger.info(f"Order {status} email sent via SES for order #{order.id}. MessageId: {response['MessageId']}")
+        return True
+        
+    except ClientError as e:
+        logger.error(f"Error sending SES {status} email for order #{order.id}: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Unexpected error sending SES {status} email for order #{order.id}: {e}")
+        return False
@@ -2,17 +2,27 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.conf import settings
 from django.contrib import messages
 from django.urls import reverse
+from django.utils import timezone
 from decimal import Decimal
+import datetime
+import logging
+import uuid
 import stripe
 from orders.models import Order
+from orders.transitions import transition_orders
 from .models import Payment
 from .utils import send_order_confirmation_email
 
 # Create your views here.
 
+logger = logging.getLogger(__name__)
+
 # Stripe API key is now loaded from settings which gets it from environment variables
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
+# Checkout sessions expire after 24 hours, so older ones aren't reused
+CHECKOUT_SESSION_REUSE = datetime.timedelta(hours=23)
+
 def payment_process(request):
     # Get the order ID from the session
     order_id = request.session.get('order_id')
@@ -23,6 +33,16 @@ def payment_process(request):
     order = get_object_or_404(Order, id=order_id)
     
     if request.method == 'POST':
+        payment = _checkout_payment(order)
+        if payment.status == 'completed':
+            messages.info(request, "This order has already been paid.")
+            return redirect('orders:order_detail', order_id=order.id)
+        
+        # A session was already created for this attempt: send the shopper
+        # back to it rather than asking Stripe for another
+        if payment.checkout_url:
+            return redirect(payment.checkout_url, code=303)
+        
         # Create a Stripe Checkout Session
         try:
             success_url = request.build_absolute_uri(reverse('payments:completed')) + '?session_id={CHECKOUT_SESSION_ID}'
@@ -30,7 +50,7 @@ def payment_process(request):
             
             # Create line items for Stripe Checkout
             line_items = []
-            for item in order.items.all():
+            for item in order.items.select_related('plant'):
                 line_items.append({
                     'price_data': {
                         'currency': 'eur',
@@ -76,15 +96,14 @@ def payment_process(request):
                         }
                     },
                 ],
+                idempotency_key=payment.idempotency_key,
             )
             
-            # Create a payment record
-            payment = Payment.objects.create(
-                order=order,
+            # Record the session on the payment
+            Payment.objects.filter(pk=payment.pk, idempotency_key=payment.idempotency_key).update(
                 payment_id=checkout_session.id,
-                amount=order.total_price,
-                method='credit_card',
-                status='pending'
+                checkout_url=checkout_session.url,
+                updated=timezone.now(),
             )
             
             # Redirect to Stripe Checkout
@@ -101,6 +120,35 @@ def payment_process(request):
             'STRIPE_PUBLIC_KEY': settings.STRIPE_PUBLIC_KEY
         })
 
+def _checkout_payment(order):
+    """
+    Return the order's payment record, creating it on the first attempt.
+    A failed attempt, or one whose Checkout session will have expired,
+    gets a new idempotency key so the next request starts a new session.
+    """
+    payment, created = Payment.objects.get_or_create(
+        order=order,
+        defaults={
+            'amount': order.total_price,
+            'method': 'credit_card',
+            'status': 'pending',
+            'idempotency_key': uuid.uuid4().hex,
+        },
+    )
+    stale = payment.updated < timezone.now() - CHECKOUT_SESSION_REUSE
+    if payment.status == 'failed' or (payment.status == 'pending' and stale):
+        # Only one of several concurrent retries gets to start the new attempt
+        Payment.objects.filter(pk=payment.pk, idempotency_key=payment.idempotency_key).update(
+            idempotency_key=uuid.uuid4().hex,
+            payment_id='',
+            checkout_url='',
+            amount=order.total_price,
+            status='pending',
+            updated=timezone.now(),
+        )
+        payment.refresh_from_db()
+    return payment
+
 def payment_completed(request):
     # Get the session ID from the query parameters
     session_id = request.GET.get('session_id')
@@ -125,9 +173,26 @@ def payment_completed(request):
             payment.status = 'completed'
             payment.save()
             
-            # Update order status
-            order.status = 'processing'
-            order.save()
+            # Update order status, unless it has already moved on (e.g. a
+            # reloaded success page for an order that has since shipped)
+            changed = transition_orders(Order.objects.filter(pk=order.pk), 'processing')
+            order.refresh_from_db()
+            
+            # The order was cancelled while the shopper was paying: the
+            # money has been taken but there's nothing to confirm
+            if not changed and order.status == 'cancelled':
+                logger.error(
+                    f"Payment {payment.payment_id} completed for cancelled order {order.id}; "
+                    f"{payment.amount} needs to be refunded."
+                )
+                if 'order_id' in request.session:
+                    del request.session['order_id']
+                messages.error(
+                    request,
+                    "This order was cancelled before your payment went through. "
+                    "Your payment will be refunded - please contact us if you have any questions."
+                )
+                return redirect('orders:order_detail', order_id=order.id)
             
             # Send order confirmation via Amazon SES
             email_sent = send_order_confirmation_email(order)
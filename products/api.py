@@ -0,0 +1,144 @@
+"""
+Read-only JSON catalog for partners and the front-end.
+
+Rows are read with .values() so no Plant instances are built, and the
+full export streams NDJSON from .iterator() in constant memory.
+"""
+import json
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from .conditional import catalog_condition
+from .facets import clean_filters, filter_q
+from .models import Plant
+from .pagination import paginate
+from .views import sort_products
+
+# Public field name -> ORM path passed to .values()
+API_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'category_id': 'category_id',
+    'category_name': 'category__name',
+    'price': 'price',
+    'description': 'description',
+    'care_instructions': 'care_instructions',
+    'difficulty': 'difficulty',
+    'stock': 'stock',
+    'image': 'image',
+    'rating_average': 'rating_summary__average',
+    'rating_total': 'rating_summary__total',
+    'created': 'created',
+    'updated': 'updated',
+}
+
+DEFAULT_FIELDS = ['id', 'name', 'category_id', 'price', 'difficulty', 'stock', 'image', 'rating_average', 'rating_total']
+
+DEFAULT_LIMIT = 24
+MAX_LIMIT = 100
+EXPORT_CHUNK_SIZE = 2000
+
+def _selected_fields(request):
+    """
+    Parse ?fields=a,b,c into known field names, or None if any are unknown.
+    """
+    raw = request.GET.get('fields')
+    if not raw:
+        return DEFAULT_FIELDS
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    if not fields or any(name not in API_FIELDS for name in fields):
+        return None
+    return fields
+
+def _error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+def _values(queryset, fields, ordering=()):
+    """
+    Select the requested fields plus any sort keys the cursor needs.
+    """
+    paths = [API_FIELDS[name] for name in fields]
+    paths += [key.lstrip('-') for key in ordering if key.lstrip('-') not in paths]
+    return queryset.values(*paths)
+
+def _serialize(row, fields):
+    item = {}
+    for name in fields:
+        value = row[API_FIELDS[name]]
+        if name == 'image':
+            value = default_storage.url(value) if value else None
+        elif name in ('rating_average', 'rating_total'):
+            value = value or 0
+        item[name] = value
+    return item
+
+def _filtered_products(request):
+    filters = clean_filters(
+        category_id=request.GET.get('category'),
+        difficulty=request.GET.get('difficulty'),
+        in_stock=request.GET.get('in_stock'),
+        price=request.GET.get('price'),
+    )
+    products = Plant.objects.filter(available=True).filter(filter_q(filters))
+    return sort_products(products, request.GET.get('sort'))
+
+def _export(products, ordering, fields):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    rows = _values(products.order_by(*ordering), fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for row in rows:
+        yield encoder.encode(_serialize(row, fields)) + '\n'
+
+@catalog_condition()
+def product_list(request):
+    """
+    List available plants as JSON, with the same filters and sort options
+    as the catalog page. ?format=ndjson streams every match instead.
+    """
+    fields = _selected_fields(request)
+    if fields is None:
+        return _error(f'Unknown field. Choose from: {", ".join(API_FIELDS)}')
+    if request.GET.get('category') and not request.GET['category'].isdigit():
+        return _error('category must be an integer ID')
+
+    products, ordering = _filtered_products(request)
+
+    if request.GET.get('format') == 'ndjson':
+        response = StreamingHttpResponse(_export(products, ordering, fields), content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="products.ndjson"'
+        return response
+
+    try:
+        limit = min(max(int(request.GET.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except ValueError:
+        return _error('limit must be an integer')
+
+    page = paginate(_values(products, fields, ordering), ordering, cursor=request.GET.get('cursor'), per_page=limit)
+
+    query = request.GET.copy()
+    next_url = previous_url = None
+    if page.has_next():
+        query['cursor'] = page.next_cursor
+        next_url = request.build_absolute_uri(f'{reverse("products_api:product_list")}?{query.urlencode()}')
+    if page.has_previous():
+        query['cursor'] = page.previous_cursor
+        previous_url = request.build_absolute_uri(f'{reverse("products_api:product_list")}?{query.urlencode()}')
+
+    return JsonResponse({
+        'results': [_serialize(row, fields) for row in page],
+        'next': next_url,
+        'previous': previous_url,
+    })
+
+@catalog_condition()
+def product_detail(request, id):
+    """
+    Return one available plant as JSON.
+    """
+    fields = _selected_fields(request)
+    if fields is None:
+        return _error(f'Unknown field. Choose from: {", ".join(API_FIELDS)}')
+    row = _values(Plant.objects.filter(id=id, available=True), fields).first()
+    if row is None:
+        return _error('Not found', status=404)
+    return JsonResponse(_serialize(row, fields))
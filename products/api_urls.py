@@ -0,0 +1,9 @@
+from django.urls import path
+from . import api
+
+app_name = 'products_api'
+
+urlpatterns = [
+    path('', api.product_list, name='product_list'),
+    path('<int:id>/', api.product_detail, name='product_detail'),
+]
@@ -0,0 +1,79 @@
+import functools
+import hashlib
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db.models import Max
+from django.views.decorators.http import condition
+from .models import Plant
+from . import versions
+
+def _user_key(request):
+    """
+    Identify whose personalised fragments (navbar, cart badge, review
+    buttons) a page contains. Returns None for a visitor with no session.
+    """
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}:{request.session.get("cart_version", 0)}'
+    if request.session.session_key:
+        return f'session:{request.session.session_key}:{request.session.get("cart_version", 0)}'
+    return None
+
+def _catalog_state(request, names, plants, forms):
+    """
+    Compute (etag, last_modified) once per request and share it between
+    the two validator callbacks. Both are None when the page must be
+    rendered regardless, e.g. when flash messages are waiting to be shown.
+    """
+    if hasattr(request, '_catalog_state'):
+        return request._catalog_state
+
+    if len(get_messages(request)):
+        request._catalog_state = (None, None)
+        return request._catalog_state
+
+    stamps = versions.get_versions(*names)
+    modified = [versions.as_datetime(stamp) for stamp in stamps.values()]
+    if plants:
+        latest = Plant.objects.aggregate(latest=Max('updated'))['latest']
+        if latest:
+            modified.append(latest)
+    last_modified = max(modified)
+
+    user_key = _user_key(request)
+    parts = [request.get_full_path(), last_modified.isoformat(), user_key or 'anonymous']
+    parts += [f'{name}={stamps[name]}' for name in names]
+    if forms:
+        # The page embeds a CSRF token derived from this cookie, so a copy
+        # rendered for another (or no) cookie would fail on submit
+        parts.append(request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+    etag = hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+    # Last-Modified can't tell users or CSRF cookies apart, so personalised
+    # pages and pages with forms only get the ETag
+    request._catalog_state = (etag, last_modified if user_key is None and not forms else None)
+    return request._catalog_state
+
+def catalog_condition(names=('category', 'reviews', 'stock', 'plants'), plants=True, forms=False):
+    """
+    Decorator answering If-None-Match / If-Modified-Since with a 304
+    before the view runs, using catalog version stamps and max(Plant.updated).
+    Set `forms` for pages containing CSRF-protected forms.
+    """
+    def etag_func(request, *args, **kwargs):
+        return _catalog_state(request, names, plants, forms)[0]
+
+    def last_modified_func(request, *args, **kwargs):
+        return _catalog_state(request, names, plants, forms)[1]
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # Browsers may keep the page but must revalidate it, and shared
+            # caches must not store personalised copies
+            response.setdefault('Cache-Control', 'private, no-cache')
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,103 @@
+from decimal import Decimal
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from .models import Plant
+
+# (key, label, lower bound inclusive, upper bound exclusive)
+PRICE_BUCKETS = [
+    ('under_10', 'Under €10', None, Decimal('10')),
+    ('10_25', '€10 - €25', Decimal('10'), Decimal('25')),
+    ('25_50', '€25 - €50', Decimal('25'), Decimal('50')),
+    ('over_50', '€50 and over', Decimal('50'), None),
+]
+
+FACETS = ('category', 'difficulty', 'in_stock', 'price')
+
+# Cached in the cache shared by all workers, so invalidate_facet_cache()
+# reaches them all. The short timeout bounds how long counts can lag
+# behind bulk updates that bypass the post_save handlers.
+UNFILTERED_CACHE_KEY = 'products:facets:unfiltered'
+UNFILTERED_CACHE_TIMEOUT = 5 * 60
+
+def price_bucket_q(key):
+    for bucket_key, label, low, high in PRICE_BUCKETS:
+        if bucket_key == key:
+            q = Q()
+            if low is not None:
+                q &= Q(price__gte=low)
+            if high is not None:
+                q &= Q(price__lt=high)
+            return q
+    return Q()
+
+def clean_filters(category_id=None, difficulty=None, in_stock=None, price=None):
+    """
+    Normalise raw request values, dropping any that aren't valid choices.
+    """
+    return {
+        'category': category_id or None,
+        'difficulty': difficulty if difficulty in dict(Plant.DIFFICULTY_CHOICES) else None,
+        'in_stock': bool(in_stock),
+        'price': price if price in [bucket[0] for bucket in PRICE_BUCKETS] else None,
+    }
+
+def filter_q(filters, exclude=None):
+    """
+    Build the WHERE clause for the active filters, optionally leaving one
+    facet out so its own values can be counted against the others.
+    """
+    q = Q()
+    if filters['category'] and exclude != 'category':
+        q &= Q(category_id=filters['category'])
+    if filters['difficulty'] and exclude != 'difficulty':
+        q &= Q(difficulty=filters['difficulty'])
+    if filters['in_stock'] and exclude != 'in_stock':
+        q &= Q(stock__gt=F('reserved'))
+    if filters['price'] and exclude != 'price':
+        q &= price_bucket_q(filters['price'])
+    return q
+
+def facet_counts(filters, category_ids):
+    """
+    Count available plants for every facet value in a single aggregate query.
+
+    Each facet is counted under all the other active filters but not its
+    own, so the sidebar shows what selecting a different value would give.
+    'total' is the number of plants matching every active filter.
+    """
+    unfiltered = not any(filters.values())
+    if unfiltered:
+        cached = cache.get(UNFILTERED_CACHE_KEY)
+        if cached is not None and set(cached['category']) == set(category_ids):
+            return cached
+
+    aggregates = {'total': Count('id', filter=filter_q(filters))}
+    for category_id in category_ids:
+        aggregates[f'category_{category_id}'] = Count(
+            'id', filter=filter_q(filters, exclude='category') & Q(category_id=category_id)
+        )
+    for difficulty, label in Plant.DIFFICULTY_CHOICES:
+        aggregates[f'difficulty_{difficulty}'] = Count(
+            'id', filter=filter_q(filters, exclude='difficulty') & Q(difficulty=difficulty)
+        )
+    aggregates['in_stock'] = Count('id', filter=filter_q(filters, exclude='in_stock') & Q(stock__gt=F('reserved')))
+    for key, label, low, high in PRICE_BUCKETS:
+        aggregates[f'price_{key}'] = Count(
+            'id', filter=filter_q(filters, exclude='price') & price_bucket_q(key)
+        )
+
+    row = Plant.objects.filter(available=True).aggregate(**aggregates)
+    counts = {
+        'total': row['total'],
+        'category': {category_id: row[f'category_{category_id}'] for category_id in category_ids},
+        'difficulty': {difficulty: row[f'difficulty_{difficulty}'] for difficulty, label in Plant.DIFFICULTY_CHOICES},
+        'in_stock': row['in_stock'],
+        'price': {key: row[f'price_{key}'] for key, label, low, high in PRICE_BUCKETS},
+    }
+
+    if unfiltered:
+        cache.set(UNFILTERED_CACHE_KEY, counts, UNFILTERED_CACHE_TIMEOUT)
+    return counts
+
+def invalidate_facet_cache():
+    cache.delete(UNFILTERED_CACHE_KEY)
@@ -0,0 +1,108 @@
+import base64
+from io import BytesIO
+from pathlib import PurePosixPath
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+from .models import Plant
+
+# Widths generated for every plant photo; wider originals are scaled
+# down, narrower ones only get a variant at their own width
+VARIANT_WIDTHS = (320, 640, 1024)
+
+# (manifest key, file extension, Pillow format, save options)
+VARIANT_FORMATS = (
+    ('webp', 'webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+PLACEHOLDER_WIDTH = 16
+
+VARIANT_DIR = 'plants/variants'
+
+def needs_variants(plant):
+    """
+    True when the plant has an image whose variants are missing or were
+    generated from a different file.
+    """
+    return bool(plant.image) and plant.image_variants.get('source') != plant.image.name
+
+def generate_variants(plant):
+    """
+    Create resized WebP and JPEG copies of the plant's image plus an inline
+    placeholder, store them through the image field's storage and return
+    the manifest to save in Plant.image_variants.
+    """
+    storage = plant.image.storage
+    with storage.open(plant.image.name, 'rb') as source:
+        image = Image.open(source)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    stem = PurePosixPath(plant.image.name).stem
+    widths = sorted({min(width, image.width) for width in VARIANT_WIDTHS})
+    manifest = {'source': plant.image.name, 'width': widths[-1]}
+
+    for key, extension, image_format, options in VARIANT_FORMATS:
+        manifest[key] = []
+        for width in widths:
+            resized = _resize(image, width)
+            if image_format == 'JPEG' and resized.mode != 'RGB':
+                resized = resized.convert('RGB')
+            buffer = BytesIO()
+            resized.save(buffer, image_format, **options)
+            name = storage.save(f'{VARIANT_DIR}/{stem}-{width}w.{extension}', ContentFile(buffer.getvalue()))
+            manifest[key].append([width, name])
+    manifest['height'] = _resize(image, widths[-1]).height
+
+    placeholder = _resize(image, PLACEHOLDER_WIDTH).convert('RGB')
+    buffer = BytesIO()
+    placeholder.save(buffer, 'JPEG', quality=40)
+    manifest['placeholder'] = 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode()
+    return manifest
+
+def variant_names(manifest):
+    return {
+        name
+        for key, extension, image_format, options in VARIANT_FORMATS
+        for width, name in manifest.get(key, [])
+    }
+
+def delete_variants(plant, manifest, keep=()):
+    """
+    Remove the stored files listed in an old manifest, except any in `keep`.
+    """
+    storage = plant.image.storage
+    for name in variant_names(manifest) - set(keep):
+        storage.delete(name)
+
+def refresh_variants(plant, force=False):
+    """
+    Regenerate the plant's variants if its image changed and save the new
+    manifest without touching the rest of the row.
+    Returns True if variants were generated.
+    """
+    if not plant.image:
+        if plant.image_variants:
+            # The image was cleared, so drop its variants too
+            delete_variants(plant, plant.image_variants)
+            Plant.objects.filter(pk=plant.pk).update(image_variants={})
+            plant.image_variants = {}
+        return False
+    if not (force or needs_variants(plant)):
+        return False
+    old_manifest = plant.image_variants
+    manifest = generate_variants(plant)
+    Plant.objects.filter(pk=plant.pk).update(image_variants=manifest)
+    plant.image_variants = manifest
+    if old_manifest:
+        # Storages that overwrite reuse the same names, so keep those
+        delete_variants(plant, old_manifest, keep=variant_names(manifest))
+    return True
+
+def _resize(image, width):
+    if width >= image.width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
@@ -0,0 +1,56 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from storages.backends.s3boto3 import S3Boto3Storage
+from botanica.storage import MediaStorage
+
+class Command(BaseCommand):
+    help = 'Measures media URLs generated per second with and without URL memoization'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--objects',
+            type=int,
+            default=200,
+            help='Number of distinct object names (a page renders each several times)',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=25,
+            help='Number of passes over the object names',
+        )
+
+    def handle(self, *args, **options):
+        names = [f'plants/variants/plant-{i}-640w.webp' for i in range(options['objects'])]
+        rounds = options['rounds']
+        
+        # Signing is local computation, so placeholder credentials are enough
+        # to benchmark when none are configured
+        storage_settings = {
+            'bucket_name': settings.AWS_STORAGE_BUCKET_NAME or 'benchmark-bucket',
+            'region_name': settings.AWS_S3_REGION_NAME or 'eu-west-1',
+            'access_key': settings.AWS_ACCESS_KEY_ID or 'AKIABENCHMARK',
+            'secret_key': settings.AWS_SECRET_ACCESS_KEY or 'benchmark-secret',
+            'querystring_auth': True,
+            'custom_domain': None,
+        }
+        
+        results = [
+            ('S3Boto3Storage (sign every call)', S3Boto3Storage(**storage_settings)),
+            ('MediaStorage (memoized signed URLs)', MediaStorage(**storage_settings)),
+            ('MediaStorage (public bucket URLs)', MediaStorage(**{**storage_settings, 'querystring_auth': False})),
+        ]
+        
+        for label, storage in results:
+            start = time.perf_counter()
+            for _ in range(rounds):
+                for name in names:
+                    storage.url(name)
+            elapsed = time.perf_counter() - start
+            total = rounds * len(names)
+            self.stdout.write(f'{label}: {total / elapsed:,.0f} URLs/s ({total} URLs in {elapsed:.2f}s)')
+        
+        stable = MediaStorage(**storage_settings)
+        if stable.url(names[0]) == stable.url(names[0]):
+            self.stdout.write(self.style.SUCCESS('Memoized URLs are stable between calls'))
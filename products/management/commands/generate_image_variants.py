@@ -0,0 +1,56 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from products.images import refresh_variants
+from products.models import Plant
+
+class Command(BaseCommand):
+    help = 'Generates responsive image variants for plants that are missing them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate variants even for plants that already have them',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Number of plants processed in parallel',
+        )
+
+    def handle(self, *args, **options):
+        force = options['force']
+        plants = Plant.objects.exclude(image='').only('id', 'name', 'image', 'image_variants')
+        
+        start = time.monotonic()
+        processed = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {
+                executor.submit(self._process, plant, force): plant
+                for plant in plants.iterator(chunk_size=500)
+            }
+            for future in as_completed(futures):
+                plant = futures[future]
+                try:
+                    if future.result():
+                        processed += 1
+                        self.stdout.write(f"Generated variants for {plant.name}")
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f"Error generating variants for {plant.name}: {str(e)}"))
+        
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated variants for {processed} plants in {elapsed:.1f}s ({failed} failed)'
+        ))
+
+    def _process(self, plant, force):
+        # Each worker thread gets its own database connection
+        close_old_connections()
+        try:
+            return refresh_variants(plant, force=force)
+        finally:
+            connections.close_all()
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from products.models import PlantRatingSummary
+
+class Command(BaseCommand):
+    help = 'Rebuilds the denormalized rating summary for every plant from its reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--plant',
+            type=int,
+            action='append',
+            dest='plant_ids',
+            help='Only rebuild the summary for this plant ID (can be repeated)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of summaries written per upsert statement',
+        )
+
+    def handle(self, *args, **options):
+        written = PlantRatingSummary.rebuild(
+            plant_ids=options['plant_ids'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating summaries for {written} plants'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from products.recommendations import TOP_K, update_recommendations
+
+class Command(BaseCommand):
+    help = 'Folds new orders into the co-purchase matrix and refreshes related product recommendations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild the matrix from every order instead of only orders since the last run',
+        )
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=TOP_K,
+            help='Number of recommendations stored per plant',
+        )
+
+    def handle(self, *args, **options):
+        orders, plants = update_recommendations(full=options['full'], top_k=options['top_k'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {orders} orders and refreshed recommendations for {plants} plants'
+        ))
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_rating_summaries(apps, schema_editor):
+    """
+    Fill the new table from existing reviews, the same way
+    PlantRatingSummary.rebuild() does.
+    """
+    Plant = apps.get_model('products', 'Plant')
+    PlantRatingSummary = apps.get_model('products', 'PlantRatingSummary')
+    Review = apps.get_model('reviews', 'Review')
+
+    stats = Review.objects.values('plant_id').order_by().annotate(
+        total=models.Count('id'),
+        rating_sum=models.Sum('rating'),
+        **{
+            f'count_{rating}': models.Count('id', filter=models.Q(rating=rating))
+            for rating in range(1, 6)
+        }
+    )
+    stats = {row.pop('plant_id'): row for row in stats}
+
+    summaries = []
+    for plant_id in Plant.objects.values_list('id', flat=True).iterator(chunk_size=1000):
+        summary = PlantRatingSummary(plant_id=plant_id, **stats.get(plant_id, {}))
+        summary.average = summary.rating_sum / summary.total if summary.total else 0
+        summaries.append(summary)
+    PlantRatingSummary.objects.bulk_create(summaries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlantRatingSummary',
+            fields=[
+                ('plant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_summary', serialize=False, to='products.plant')),
+                ('average', models.FloatField(db_index=True, default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('count_1', models.PositiveIntegerField(default=0)),
+                ('count_2', models.PositiveIntegerField(default=0)),
+                ('count_3', models.PositiveIntegerField(default=0)),
+                ('count_4', models.PositiveIntegerField(default=0)),
+                ('count_5', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Plant rating summaries',
+            },
+        ),
+        migrations.RunPython(build_rating_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_plantratingsummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['available', 'name', 'id'], name='plant_avail_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['available', 'price', 'id'], name='plant_avail_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['available', 'created', 'id'], name='plant_avail_created_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE products_plant_search USING fts5("
+            "name, description, care_instructions, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO products_plant_search (rowid, name, description, care_instructions) "
+            "SELECT id, name, description, care_instructions FROM products_plant"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE products_plant_search ("
+            "plant_id bigint PRIMARY KEY REFERENCES products_plant (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX products_plant_search_document_idx ON products_plant_search USING gin (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO products_plant_search (plant_id, document) "
+            "SELECT id, "
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(care_instructions, '')), 'C') "
+            "FROM products_plant"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS products_plant_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_plant_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_plant_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['updated'], name='plant_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_plant_updated_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plant',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
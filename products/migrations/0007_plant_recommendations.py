@@ -0,0 +1,56 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_plant_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_order_id', models.BigIntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PlantRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.PositiveIntegerField()),
+                ('plant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='products.plant')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_for', to='products.plant')),
+            ],
+            options={
+                'ordering': ['plant', 'rank'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CoPurchase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.plant')),
+                ('plant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.plant')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='plantrecommendation',
+            constraint=models.UniqueConstraint(fields=('plant', 'rank'), name='unique_recommendation_rank'),
+        ),
+        migrations.AddIndex(
+            model_name='copurchase',
+            index=models.Index(fields=['plant', '-orders', 'other'], name='copurchase_plant_orders_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='copurchase',
+            constraint=models.UniqueConstraint(fields=('plant', 'other'), name='unique_copurchase_pair'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_plant_recommendations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plant',
+            name='reserved',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
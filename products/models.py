@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Cast
 from django.urls import reverse
 
 # Create your models here.
@@ -29,13 +30,209 @@ class Plant(models.Model):
     care_instructions = models.TextField(blank=True)
     difficulty = models.CharField(max_length=10, choices=DIFFICULTY_CHOICES, default='medium')
     image = models.ImageField(upload_to='plants/', blank=True)
+    # Resized copies of `image`, maintained by products.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     stock = models.PositiveIntegerField(default=0)
+    # Units held by shoppers' carts, maintained by cart.reservations
+    reserved = models.PositiveIntegerField(default=0, editable=False)
     available = models.BooleanField(default=True)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        # Match the catalog sort orders so keyset pagination is an index range scan
+        indexes = [
+            models.Index(fields=['available', 'name', 'id'], name='plant_avail_name_idx'),
+            models.Index(fields=['available', 'price', 'id'], name='plant_avail_price_idx'),
+            models.Index(fields=['available', 'created', 'id'], name='plant_avail_created_idx'),
+            # max(updated) is the catalog's Last-Modified validator
+            models.Index(fields=['updated'], name='plant_updated_idx'),
+        ]
+    
     def __str__(self):
         return self.name
     
     def get_absolute_url(self):
         return reverse('products:product_detail', args=[self.id])
+    
+    def save(self, *args, **kwargs):
+        # `reserved` is only ever changed by conditional UPDATEs, so saving
+        # an instance loaded earlier must not write back a stale count
+        if self.pk and not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'reserved'
+            ]
+        super().save(*args, **kwargs)
+    
+    @property
+    def available_stock(self):
+        """
+        Units that can still be added to a cart.
+        """
+        return max(self.stock - self.reserved, 0)
+
+class PlantRatingSummary(models.Model):
+    """
+    Denormalized review statistics for a plant, kept in step with the
+    reviews table so pages can read one row instead of aggregating.
+    """
+    plant = models.OneToOneField(Plant, on_delete=models.CASCADE, primary_key=True, related_name='rating_summary')
+    average = models.FloatField(default=0, db_index=True)
+    total = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    count_1 = models.PositiveIntegerField(default=0)
+    count_2 = models.PositiveIntegerField(default=0)
+    count_3 = models.PositiveIntegerField(default=0)
+    count_4 = models.PositiveIntegerField(default=0)
+    count_5 = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name_plural = 'Plant rating summaries'
+    
+    def __str__(self):
+        return f'{self.plant_id} - {self.average:.1f} ({self.total})'
+    
+    def rating_counts(self):
+        """
+        Histogram in the shape the product detail template expects,
+        highest rating first.
+        """
+        counts = {}
+        for rating in range(5, 0, -1):
+            count = getattr(self, f'count_{rating}')
+            counts[str(rating)] = {
+                'count': count,
+                'percentage': (count / self.total) * 100 if self.total else 0,
+            }
+        return counts
+    
+    @classmethod
+    def apply_change(cls, plant_id, added=None, removed=None):
+        """
+        Adjust the summary for one review being added, removed or changed
+        from `removed` to `added` in a single UPDATE statement.
+        Returns the number of rows updated (0 if the plant has no summary yet).
+        """
+        total_delta = (added is not None) - (removed is not None)
+        sum_delta = (added or 0) - (removed or 0)
+        changes = {
+            'total': models.F('total') + total_delta,
+            'rating_sum': models.F('rating_sum') + sum_delta,
+            # Right-hand sides see the pre-update row, so derive the new
+            # average from the old totals plus the deltas
+            'average': models.Case(
+                models.When(total=-total_delta, then=models.Value(0.0)),
+                default=(
+                    Cast(models.F('rating_sum') + sum_delta, models.FloatField())
+                    / (models.F('total') + total_delta)
+                ),
+                output_field=models.FloatField(),
+            ),
+        }
+        if added is not None:
+            changes[f'count_{added}'] = models.F(f'count_{added}') + 1
+        if removed is not None:
+            field = f'count_{removed}'
+            changes[field] = changes.get(field, models.F(field)) - 1
+        return cls.objects.filter(plant_id=plant_id).update(**changes)
+    
+    @classmethod
+    def rebuild(cls, plant_ids=None, batch_size=1000):
+        """
+        Recompute summaries from the reviews table with one grouped
+        aggregate and write them back with batched upserts.
+        Returns the number of summaries written.
+        """
+        from reviews.models import Review
+        
+        reviews = Review.objects.all()
+        plants = Plant.objects.all()
+        if plant_ids is not None:
+            reviews = reviews.filter(plant_id__in=plant_ids)
+            plants = plants.filter(id__in=plant_ids)
+        
+        stats = reviews.values('plant_id').order_by().annotate(
+            total=models.Count('id'),
+            rating_sum=models.Sum('rating'),
+            **{
+                f'count_{rating}': models.Count('id', filter=models.Q(rating=rating))
+                for rating in range(1, 6)
+            }
+        )
+        stats = {row.pop('plant_id'): row for row in stats}
+        
+        fields = ['average', 'total', 'rating_sum'] + [f'count_{rating}' for rating in range(1, 6)]
+        written = 0
+        batch = []
+        for plant_id in plants.values_list('id', flat=True).iterator(chunk_size=batch_size):
+            row = stats.get(plant_id, {})
+            summary = cls(plant_id=plant_id, **row)
+            summary.average = summary.rating_sum / summary.total if summary.total else 0
+            batch.append(summary)
+            if len(batch) >= batch_size:
+                written += len(cls._upsert(batch, fields))
+                batch = []
+        if batch:
+            written += len(cls._upsert(batch, fields))
+        return written
+    
+    @classmethod
+    def _upsert(cls, summaries, fields):
+        return cls.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=['plant'],
+            update_fields=fields,
+        )
+
+class CoPurchase(models.Model):
+    """
+    One cell of the sparse plant-by-plant co-purchase matrix: how many
+    orders contained both plants. Stored in both directions.
+    """
+    plant = models.ForeignKey(Plant, on_delete=models.CASCADE, related_name='+')
+    other = models.ForeignKey(Plant, on_delete=models.CASCADE, related_name='+')
+    orders = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['plant', 'other'], name='unique_copurchase_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['plant', '-orders', 'other'], name='copurchase_plant_orders_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.plant_id} + {self.other_id}: {self.orders}'
+
+class PlantRecommendation(models.Model):
+    """
+    Precomputed top-k co-purchased neighbours of a plant, read by the
+    product detail page in a single indexed query.
+    """
+    plant = models.ForeignKey(Plant, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(Plant, on_delete=models.CASCADE, related_name='recommended_for')
+    rank = models.PositiveSmallIntegerField()
+    score = models.PositiveIntegerField()
+    
+    class Meta:
+        ordering = ['plant', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['plant', 'rank'], name='unique_recommendation_rank'),
+        ]
+    
+    def __str__(self):
+        return f'{self.plant_id} -> {self.recommended_id} (#{self.rank})'
+
+class RecommendationWatermark(models.Model):
+    """
+    Single row recording the last order folded into the co-purchase matrix.
+    """
+    last_order_id = models.BigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+    
+    @classmethod
+    def get(cls):
+        watermark, created = cls.objects.get_or_create(pk=1)
+        return watermark
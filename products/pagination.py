@@ -0,0 +1,128 @@
+import base64
+import datetime
+import json
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    JSON encoder that keeps full microsecond precision on datetimes,
+    since a truncated sort key would skip or repeat rows.
+    """
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+class KeysetPage:
+    """
+    One page of results from keyset pagination, with opaque cursors
+    for the neighbouring pages (None when there is no such page).
+    """
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+def encode_cursor(values, forward=True):
+    """
+    Turn the sort-key values of a boundary row into a URL-safe cursor.
+    """
+    payload = json.dumps({'d': 'n' if forward else 'p', 'k': values}, cls=CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, queryset, ordering):
+    """
+    Decode a cursor back into typed sort-key values.
+    Returns (values, forward), or (None, True) for a missing or invalid cursor.
+    """
+    if not cursor:
+        return None, True
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        raw_values = payload['k']
+        if len(raw_values) != len(ordering):
+            return None, True
+        values = [
+            _output_field(queryset, key.lstrip('-')).to_python(value)
+            for key, value in zip(ordering, raw_values)
+        ]
+        return values, payload['d'] != 'p'
+    except (ValueError, TypeError, KeyError, ValidationError):
+        return None, True
+
+def paginate(queryset, ordering, cursor=None, per_page=24):
+    """
+    Return a KeysetPage of `queryset` ordered by `ordering`.
+
+    `ordering` must end with a unique field (e.g. 'id') so every row has a
+    distinct position. Rows are located with a WHERE clause on the sort key
+    instead of an OFFSET, so every page costs the same as the first.
+    """
+    values, forward = decode_cursor(cursor, queryset, ordering)
+
+    if forward:
+        page_ordering = ordering
+    else:
+        page_ordering = [key[1:] if key.startswith('-') else f'-{key}' for key in ordering]
+
+    queryset = queryset.order_by(*page_ordering)
+    if values is not None:
+        queryset = queryset.filter(_after(ordering, values, forward))
+
+    rows = list(queryset[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+
+    next_cursor = previous_cursor = None
+    if rows:
+        if (forward and has_more) or (not forward and values is not None):
+            next_cursor = encode_cursor(_key_values(rows[-1], ordering), forward=True)
+        if (not forward and has_more) or (forward and values is not None):
+            previous_cursor = encode_cursor(_key_values(rows[0], ordering), forward=False)
+
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+def _after(ordering, values, forward):
+    """
+    Build the WHERE clause selecting rows strictly after (or before, when
+    paging backwards) the given sort-key values.
+    """
+    condition = Q()
+    equal_so_far = Q()
+    for key, value in zip(ordering, values):
+        name = key.lstrip('-')
+        descending = key.startswith('-')
+        lookup = 'lt' if descending == forward else 'gt'
+        condition |= equal_so_far & Q(**{f'{name}__{lookup}': value})
+        equal_so_far &= Q(**{name: value})
+    return condition
+
+def _key_values(obj, ordering):
+    # Rows may be model instances or dicts from .values()
+    if isinstance(obj, dict):
+        return [obj[key.lstrip('-')] for key in ordering]
+    return [getattr(obj, key.lstrip('-')) for key in ordering]
+
+def _output_field(queryset, name):
+    if name in queryset.query.annotations:
+        return queryset.query.annotations[name].output_field
+    if name == 'pk':
+        return queryset.model._meta.pk
+    return queryset.model._meta.get_field(name)
@@ -0,0 +1,135 @@
+import datetime
+from django.db import transaction
+from django.db.models import Count, F, Max, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from . import versions
+from .models import CoPurchase, Plant, PlantRecommendation, RecommendationWatermark
+
+TOP_K = 8
+
+# Orders younger than this may still be having their items written,
+# so they are left for the next run
+SETTLE_DELAY = datetime.timedelta(minutes=5)
+
+def _pair_counts(order_items):
+    """
+    Count co-purchases for every ordered pair of distinct plants in the
+    given order items with one self-join and GROUP BY in the database.
+    Returns {(plant_id, other_id): orders}.
+    """
+    pairs = (
+        order_items
+        .annotate(other_id=F('order__items__plant_id'))
+        .exclude(other_id=F('plant_id'))
+        .values('plant_id', 'other_id')
+        .order_by()
+        .annotate(orders=Count('order_id', distinct=True))
+    )
+    return {(row['plant_id'], row['other_id']): row['orders'] for row in pairs}
+
+def _apply_pair_counts(deltas, replace=False, batch_size=1000):
+    """
+    Add (or with `replace`, write) pair counts into the CoPurchase table.
+    """
+    if not deltas:
+        return
+    totals = dict(deltas)
+    if not replace:
+        plant_ids = {plant_id for plant_id, other_id in deltas}
+        existing = CoPurchase.objects.filter(plant_id__in=plant_ids).values_list('plant_id', 'other_id', 'orders')
+        for plant_id, other_id, orders in existing.iterator(chunk_size=batch_size):
+            if (plant_id, other_id) in totals:
+                totals[(plant_id, other_id)] += orders
+    CoPurchase.objects.bulk_create(
+        [CoPurchase(plant_id=plant_id, other_id=other_id, orders=orders) for (plant_id, other_id), orders in totals.items()],
+        update_conflicts=True,
+        unique_fields=['plant', 'other'],
+        update_fields=['orders'],
+        batch_size=batch_size,
+    )
+
+def _rebuild_top_k(plant_ids=None, top_k=TOP_K, batch_size=1000):
+    """
+    Replace the stored neighbours of the given plants (or of every plant)
+    with their current top-k co-purchases, ranked by a window function in
+    the database.
+    """
+    pairs = CoPurchase.objects.all()
+    recommendations = PlantRecommendation.objects.all()
+    if plant_ids is not None:
+        pairs = pairs.filter(plant_id__in=plant_ids)
+        recommendations = recommendations.filter(plant_id__in=plant_ids)
+    ranked = (
+        pairs
+        .annotate(rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('plant_id')],
+            order_by=[F('orders').desc(), F('other_id').asc()],
+        ))
+        .filter(rank__lte=top_k)
+        .values_list('plant_id', 'other_id', 'orders', 'rank')
+    )
+    recommendations.delete()
+    PlantRecommendation.objects.bulk_create(
+        [
+            PlantRecommendation(plant_id=plant_id, recommended_id=other_id, score=orders, rank=rank)
+            for plant_id, other_id, orders, rank in ranked
+        ],
+        batch_size=batch_size,
+    )
+
+def update_recommendations(full=False, top_k=TOP_K):
+    """
+    Fold orders placed since the last run into the co-purchase matrix and
+    refresh the neighbours of every plant they touched. With `full`, the
+    matrix is rebuilt from every order (e.g. after cancellations).
+    Returns (orders processed, plants refreshed).
+    """
+    from orders.models import Order, OrderItem
+
+    with transaction.atomic():
+        watermark = RecommendationWatermark.objects.select_for_update().get(pk=RecommendationWatermark.get().pk)
+        low = 0 if full else watermark.last_order_id
+        settled = Order.objects.filter(id__gt=low, created__lt=timezone.now() - SETTLE_DELAY)
+        high = settled.aggregate(high=Max('id'))['high']
+        if high is None:
+            return 0, 0
+
+        orders = settled.filter(id__lte=high).exclude(status='cancelled')
+        order_items = OrderItem.objects.filter(order__in=orders)
+        deltas = _pair_counts(order_items)
+
+        plant_ids = {plant_id for plant_id, other_id in deltas}
+        if full:
+            CoPurchase.objects.all().delete()
+        _apply_pair_counts(deltas, replace=full)
+        _rebuild_top_k(None if full else list(plant_ids), top_k=top_k)
+
+        watermark.last_order_id = high
+        watermark.save()
+        order_count = orders.count()
+    if full or plant_ids:
+        # Related products on the detail pages changed
+        versions.bump('plants')
+    return order_count, len(plant_ids)
+
+def recommended_plants(plant, limit=4):
+    """
+    Return up to `limit` available plants to show alongside `plant`:
+    precomputed co-purchase neighbours first, topped up from the same
+    category for plants with little or no purchase history.
+    """
+    plants = list(
+        Plant.objects.filter(recommended_for__plant=plant, available=True)
+        .select_related('category')
+        .order_by('recommended_for__rank')[:limit]
+    )
+    if len(plants) < limit:
+        exclude_ids = [plant.id] + [p.id for p in plants]
+        plants += list(
+            Plant.objects.filter(category_id=plant.category_id, available=True)
+            .select_related('category')
+            .exclude(id__in=exclude_ids)[:limit - len(plants)]
+        )
+    return plants
@@ -0,0 +1,180 @@
+"""
+Full-text search over plant names, descriptions and care instructions.
+
+The index lives in the `products_plant_search` table, which is an FTS5
+virtual table on SQLite and a tsvector column with a GIN index on
+PostgreSQL (see migration 0004_plant_search_index). Other databases fall back to icontains.
+"""
+import re
+from django.db import connection
+from django.db.models import Q
+from .models import Plant
+
+SEARCH_TABLE = 'products_plant_search'
+
+# Relative weight of each column when ranking matches
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 4.0
+CARE_WEIGHT = 1.0
+
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(care_instructions, '')), 'C')"
+)
+
+def is_supported():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+def _terms(query):
+    """
+    Split user input into plain word tokens so it can never be parsed as
+    FTS5 or tsquery syntax.
+    """
+    return re.findall(r'\w+', query.lower())
+
+def index_plants(plant_ids):
+    """
+    (Re)index the given plants from their current database rows.
+    """
+    plant_ids = list(plant_ids)
+    if not plant_ids or not is_supported():
+        return
+    remove_plants(plant_ids)
+    placeholders = ', '.join(['%s'] * len(plant_ids))
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, name, description, care_instructions) '
+                f'SELECT id, name, description, care_instructions FROM products_plant '
+                f'WHERE id IN ({placeholders})',
+                plant_ids,
+            )
+        else:
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (plant_id, document) '
+                f'SELECT id, {POSTGRES_DOCUMENT} FROM products_plant '
+                f'WHERE id IN ({placeholders})',
+                plant_ids,
+            )
+
+def remove_plants(plant_ids):
+    plant_ids = list(plant_ids)
+    if not plant_ids or not is_supported():
+        return
+    placeholders = ', '.join(['%s'] * len(plant_ids))
+    key = 'rowid' if connection.vendor == 'sqlite' else 'plant_id'
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE {key} IN ({placeholders})', plant_ids)
+
+def rebuild_index():
+    """
+    Rebuild the whole index from the plants table in one INSERT ... SELECT.
+    Returns the number of plants indexed.
+    """
+    if not is_supported():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, name, description, care_instructions) '
+                f'SELECT id, name, description, care_instructions FROM products_plant'
+            )
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+        else:
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (plant_id, document) '
+                f'SELECT id, {POSTGRES_DOCUMENT} FROM products_plant'
+            )
+        cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
+
+def _sqlite_match(terms):
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def _postgres_tsquery(terms):
+    return ' & '.join(f'{term}:*' for term in terms)
+
+def _fallback_q(terms):
+    condition = Q()
+    for term in terms:
+        condition &= (
+            Q(name__icontains=term)
+            | Q(description__icontains=term)
+            | Q(care_instructions__icontains=term)
+        )
+    return condition
+
+def search_plant_ids(query, limit=48):
+    """
+    Return the IDs of available plants matching every word of `query`
+    (words match as prefixes), best match first.
+    """
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    if connection.vendor == 'sqlite':
+        sql = (
+            f'SELECT p.id FROM ('
+            f'SELECT rowid AS plant_id, bm25({SEARCH_TABLE}, %s, %s, %s) AS score '
+            f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+            f') m JOIN products_plant p ON p.id = m.plant_id '
+            f'WHERE p.available ORDER BY m.score, p.id LIMIT %s'
+        )
+        params = [NAME_WEIGHT, DESCRIPTION_WEIGHT, CARE_WEIGHT, _sqlite_match(terms), limit]
+    elif connection.vendor == 'postgresql':
+        tsquery = _postgres_tsquery(terms)
+        # ts_rank_cd takes weights in {D, C, B, A} order, scaled to 0..1
+        weights = '{0, %s, %s, 1}' % (CARE_WEIGHT / NAME_WEIGHT, DESCRIPTION_WEIGHT / NAME_WEIGHT)
+        sql = (
+            f"SELECT s.plant_id FROM {SEARCH_TABLE} s "
+            f"JOIN products_plant p ON p.id = s.plant_id "
+            f"WHERE s.document @@ to_tsquery('english', %s) AND p.available "
+            f"ORDER BY ts_rank_cd(%s::float4[], s.document, to_tsquery('english', %s)) DESC, s.plant_id "
+            f"LIMIT %s"
+        )
+        params = [tsquery, weights, tsquery, limit]
+    else:
+        return list(Plant.objects.filter(_fallback_q(terms), available=True).values_list('id', flat=True)[:limit])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+def count_matches(query):
+    """
+    Return how many available plants match `query`, however many
+    search_plant_ids() was asked for.
+    """
+    terms = _terms(query)
+    if not terms:
+        return 0
+
+    if connection.vendor == 'sqlite':
+        sql = (
+            f'SELECT COUNT(*) FROM {SEARCH_TABLE} JOIN products_plant p ON p.id = {SEARCH_TABLE}.rowid '
+            f'WHERE {SEARCH_TABLE} MATCH %s AND p.available'
+        )
+        params = [_sqlite_match(terms)]
+    elif connection.vendor == 'postgresql':
+        sql = (
+            f"SELECT COUNT(*) FROM {SEARCH_TABLE} s JOIN products_plant p ON p.id = s.plant_id "
+            f"WHERE s.document @@ to_tsquery('english', %s) AND p.available"
+        )
+        params = [_postgres_tsquery(terms)]
+    else:
+        return Plant.objects.filter(_fallback_q(terms), available=True).count()
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone()[0]
+
+def search_plants(query, limit=48):
+    """
+    Return matching available Plant instances in relevance order.
+    """
+    plant_ids = search_plant_ids(query, limit=limit)
+    plants = Plant.objects.select_related('category', 'rating_summary').in_bulk(plant_ids)
+    return [plants[plant_id] for plant_id in plant_ids if plant_id in plants]
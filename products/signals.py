@@ -0,0 +1,64 @@
+import logging
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .facets import invalidate_facet_cache
+from .models import Category, Plant
+from . import images, search, versions
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Plant)
+def index_plant_on_save(sender, instance, raw=False, **kwargs):
+    """
+    Refresh the plant's full-text search entry.
+    """
+    if raw:
+        return
+    search.index_plants([instance.pk])
+
+
+@receiver(post_delete, sender=Plant)
+def remove_plant_from_index(sender, instance, **kwargs):
+    search.remove_plants([instance.pk])
+
+
+@receiver(post_save, sender=Plant)
+@receiver(post_delete, sender=Plant)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_facets(sender, **kwargs):
+    """
+    Drop the cached unfiltered facet counts whenever the catalog changes.
+    """
+    invalidate_facet_cache()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_version(sender, **kwargs):
+    """
+    Cards and catalog pages show category names, so a category change
+    invalidates them all.
+    """
+    versions.bump('category')
+
+
+@receiver(post_delete, sender=Plant)
+def bump_plants_version(sender, **kwargs):
+    # Deleting the newest plant can move max(Plant.updated) backwards
+    versions.bump('plants')
+
+
+@receiver(post_save, sender=Plant)
+def generate_image_variants(sender, instance, raw=False, **kwargs):
+    """
+    Build resized copies of a newly saved image. A failure here must not
+    lose the save, so it is logged and left for the backfill command.
+    """
+    if raw:
+        return
+    try:
+        images.refresh_variants(instance)
+    except Exception as e:
+        logger.error(f"Error generating image variants for plant #{instance.pk}: {e}")
@@ -0,0 +1,46 @@
+from django import template
+from django.templatetags.static import static
+
+register = template.Library()
+
+@register.simple_tag
+def srcset(plant, image_format='jpeg'):
+    """
+    Build a srcset attribute value from the plant's stored variants.
+    Usage: <img srcset="{% srcset product 'webp' %}">
+    """
+    variants = plant.image_variants.get(image_format, [])
+    storage = plant.image.storage
+    return ', '.join(f'{storage.url(name)} {width}w' for width, name in variants)
+
+@register.inclusion_tag('products/plant_image.html')
+def plant_image(plant, sizes='100vw', css_class='', lazy=True):
+    """
+    Render a responsive <picture> for a plant, falling back to the original
+    image until variants exist and to the placeholder graphic without one.
+    Usage: {% plant_image product sizes="(min-width: 768px) 33vw, 100vw" css_class="card-img-top" %}
+    """
+    context = {
+        'alt': plant.name,
+        'sizes': sizes,
+        'css_class': css_class,
+        'lazy': lazy,
+        'has_variants': False,
+    }
+    variants = plant.image_variants if plant.image else {}
+    if variants.get('jpeg'):
+        largest = variants['jpeg'][-1][1]
+        context.update({
+            'has_variants': True,
+            'webp_srcset': srcset(plant, 'webp'),
+            'jpeg_srcset': srcset(plant, 'jpeg'),
+            'src': plant.image.storage.url(largest),
+            'width': variants.get('width'),
+            'height': variants.get('height'),
+            'placeholder': variants.get('placeholder'),
+        })
+    elif plant.image:
+        context['src'] = plant.image.url
+    else:
+        context.update({'src': static('images/no_image.png'), 'alt': 'No image available'})
+    return context
@@ -1,3 +1,47 @@
-from django.test import TestCase
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from .models import Category, Plant
+from .views import SEARCH_RESULTS_LIMIT
+from . import search
 
 # Create your tests here.
+
+# Plants without images fall back to a static placeholder, which mustn't
+# depend on the S3 settings
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    STATIC_URL='/static/',
+)
+class CatalogConditionalGetTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Ferns')
+        Plant.objects.create(name='Boston Fern', category=category, price='12.00', description='x', stock=5)
+
+    def test_pages_with_forms_are_revalidated_per_csrf_cookie(self):
+        url = reverse('products:product_list')
+        first = self.client.get(url)
+        self.assertNotIn('Last-Modified', first)
+
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 32
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(cached.status_code, 200)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=cached['ETag']).status_code, 304,
+        )
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    STATIC_URL='/static/',
+)
+class ProductSearchTests(TestCase):
+    def test_count_includes_matches_past_the_limit(self):
+        category = Category.objects.create(name='Ferns')
+        plants = Plant.objects.bulk_create([
+            Plant(name=f'Fern {i}', category=category, price='12.00', description='x', stock=5)
+            for i in range(SEARCH_RESULTS_LIMIT + 2)
+        ])
+        search.index_plants([plant.id for plant in plants])
+        response = self.client.get(reverse('products:product_search'), {'q': 'fern'})
+        self.assertEqual(len(response.context['products']), SEARCH_RESULTS_LIMIT)
+        self.assertEqual(response.context['total'], SEARCH_RESULTS_LIMIT + 2)
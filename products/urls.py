@@ -5,6 +5,7 @@ app_name = 'products'
 
 urlpatterns = [
     path('', views.product_list, name='product_list'),
+    path('search/', views.product_search, name='product_search'),
     path('category/<int:category_id>/', views.product_list, name='product_list_by_category'),
     path('<int:id>/', views.product_detail, name='product_detail'),
 ]
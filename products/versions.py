@@ -0,0 +1,41 @@
+import datetime
+import time
+from django.core.cache import cache
+
+# Named version stamps for data that catalog pages depend on:
+#   'category' - any Category saved or deleted
+#   'reviews'  - any Review saved or deleted
+#   'stock'    - stock levels changed by queryset updates (Plant.save()
+#                already moves Plant.updated)
+#   'plants'   - a Plant deleted
+# Stamps are nanosecond timestamps, so an evicted key is simply re-stamped
+# and can never collide with a value that was used before. They must live
+# in the shared cache (settings.CACHES) so a bump reaches every worker.
+
+def cache_key(name):
+    return f'products:version:{name}'
+
+def bump(*names):
+    now = time.time_ns()
+    cache.set_many({cache_key(name): now for name in names}, None)
+
+def get_versions(*names):
+    """
+    Return {name: stamp} for the given versions in one cache round trip,
+    stamping any that are missing.
+    """
+    found = cache.get_many([cache_key(name) for name in names])
+    versions = {name: found.get(cache_key(name)) for name in names}
+    missing = [name for name, stamp in versions.items() if stamp is None]
+    if missing:
+        # add() only writes if no other worker stamped the key first, so
+        # every worker ends up with the same stamp and the same ETags
+        now = time.time_ns()
+        for name in missing:
+            cache.add(cache_key(name), now, None)
+        found = cache.get_many([cache_key(name) for name in missing])
+        versions.update({name: found.get(cache_key(name), now) for name in missing})
+    return versions
+
+def as_datetime(stamp):
+    return datetime.datetime.fromtimestamp(stamp / 1e9, tz=datetime.timezone.utc)
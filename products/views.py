@@ -1,57 +1,119 @@
 from django.shortcuts import render, get_object_or_404
-from .models import Category, Plant
+from .cards import render_product_cards
+from .conditional import catalog_condition
+from .facets import PRICE_BUCKETS, clean_filters, facet_counts, filter_q
+from .models import Category, Plant, PlantRatingSummary
+from .pagination import paginate
+from .recommendations import recommended_plants
+from .search import count_matches, search_plants
 from django.db import models
+from django.db.models.functions import Coalesce
 
 # Create your views here.
 
+PRODUCTS_PER_PAGE = 24
+SEARCH_RESULTS_LIMIT = 48
+
+SORT_ORDERINGS = {
+    'price_low': ['price', 'id'],
+    'price_high': ['-price', '-id'],
+    'name': ['name', 'id'],
+    'newest': ['-created', '-id'],
+    'rating': ['-rating_average', '-rating_total', '-id'],
+}
+
+def sort_products(products, sort):
+    """
+    Annotate `products` with whatever the requested sort needs and return
+    (queryset, ordering). Every ordering ends in 'id' so the keyset cursor
+    has a unique position to resume from.
+    """
+    ordering = SORT_ORDERINGS.get(sort, SORT_ORDERINGS['name'])
+    if sort == 'rating':
+        products = products.annotate(
+            rating_average=Coalesce('rating_summary__average', models.Value(0.0)),
+            rating_total=Coalesce('rating_summary__total', models.Value(0), output_field=models.IntegerField()),
+        )
+    return products, ordering
+
+@catalog_condition(forms=True)
 def product_list(request, category_id=None):
     """
     View to display a list of plants, optionally filtered by category.
     """
     category = None
-    categories = Category.objects.all()
-    products = Plant.objects.filter(available=True)
+    categories = list(Category.objects.all())
+    products = Plant.objects.filter(available=True).select_related('category', 'rating_summary')
     
     if category_id:
         category = get_object_or_404(Category, id=category_id)
-        products = products.filter(category=category)
     
     # Get filter parameters from request
     difficulty = request.GET.get('difficulty')
+    in_stock = request.GET.get('in_stock')
+    price = request.GET.get('price')
     sort = request.GET.get('sort')
     
-    # Apply difficulty filter if provided
-    if difficulty:
-        products = products.filter(difficulty=difficulty)
+    # Apply category, difficulty, stock and price filters
+    filters = clean_filters(category_id=category_id, difficulty=difficulty, in_stock=in_stock, price=price)
+    products = products.filter(filter_q(filters))
+    
+    # Counts for every sidebar option (and the total) in one query
+    counts = facet_counts(filters, [c.id for c in categories])
+    for c in categories:
+        c.plant_count = counts['category'][c.id]
+    difficulty_facets = [
+        (value, label, counts['difficulty'][value]) for value, label in Plant.DIFFICULTY_CHOICES
+    ]
+    price_facets = [
+        (key, label, counts['price'][key]) for key, label, low, high in PRICE_BUCKETS
+    ]
     
     # Apply sorting if provided
-    if sort == 'price_low':
-        products = products.order_by('price')
-    elif sort == 'price_high':
-        products = products.order_by('-price')
-    elif sort == 'name':
-        products = products.order_by('name')
-    elif sort == 'newest':
-        products = products.order_by('-created')
+    products, ordering = sort_products(products, sort)
+    
+    page = paginate(products, ordering, cursor=request.GET.get('cursor'), per_page=PRODUCTS_PER_PAGE)
+    
+    query = request.GET.copy()
+    query.pop('cursor', None)
+    filter_query = query.urlencode()
+    next_url = previous_url = None
+    if page.has_next():
+        query['cursor'] = page.next_cursor
+        next_url = f'?{query.urlencode()}'
+    if page.has_previous():
+        query['cursor'] = page.previous_cursor
+        previous_url = f'?{query.urlencode()}'
     
     context = {
         'category': category,
         'categories': categories,
-        'products': products,
-        'selected_difficulty': difficulty,
+        'products': page,
+        'cards': render_product_cards(request, page),
+        'total_count': counts['total'],
+        'next_url': next_url,
+        'previous_url': previous_url,
+        'filter_query': filter_query,
+        'difficulty_facets': difficulty_facets,
+        'price_facets': price_facets,
+        'in_stock_count': counts['in_stock'],
+        'selected_difficulty': filters['difficulty'],
+        'selected_in_stock': filters['in_stock'],
+        'selected_price': filters['price'],
         'selected_sort': sort,
     }
     
     return render(request, 'products/product_list.html', context)
 
+@catalog_condition(forms=True)
 def product_detail(request, id):
     """
     View to display detailed information about a specific plant.
     """
-    product = get_object_or_404(Plant, id=id, available=True)
+    product = get_object_or_404(Plant.objects.select_related('category', 'rating_summary'), id=id, available=True)
     
     # Get related products (same category)
-    related_products = Plant.objects.filter(category=product.category, available=True).exclude(id=product.id)[:4]
+    related_products = recommended_plants(product, limit=4)
     
     # Get reviews for this product
     reviews = product.reviews.all()
@@ -65,26 +127,15 @@ def product_detail(request, id):
         user_has_purchased = has_user_purchased_product(request.user, id)
         user_review = product.reviews.filter(user=request.user).first()
     
-    # Calculate average rating
-    avg_rating = reviews.aggregate(models.Avg('rating'))['rating__avg'] or 0
-    
-    # Count reviews by rating
-    rating_counts = {
-        '5': reviews.filter(rating=5).count(),
-        '4': reviews.filter(rating=4).count(),
-        '3': reviews.filter(rating=3).count(),
-        '2': reviews.filter(rating=2).count(),
-        '1': reviews.filter(rating=1).count(),
-    }
+    # Rating statistics come from the denormalized summary row
+    try:
+        rating_summary = product.rating_summary
+    except PlantRatingSummary.DoesNotExist:
+        rating_summary = PlantRatingSummary(plant=product)
     
-    # Calculate percentages for the rating bars
-    total_reviews = reviews.count()
-    if total_reviews > 0:
-        for rating in rating_counts:
-            rating_counts[rating] = {
-                'count': rating_counts[rating],
-                'percentage': (rating_counts[rating] / total_reviews) * 100
-            }
+    avg_rating = rating_summary.average
+    total_reviews = rating_summary.total
+    rating_counts = rating_summary.rating_counts()
     
     # Apply rating filter if provided
     selected_rating = request.GET.get('rating')
@@ -112,3 +163,21 @@ def product_detail(request, id):
     }
     
     return render(request, 'products/product_detail.html', context)
+
+def product_search(request):
+    """
+    View to display plants matching a full-text search, best match first.
+    """
+    query = request.GET.get('q', '').strip()
+    results = search_plants(query, limit=SEARCH_RESULTS_LIMIT) if query else []
+    # Only a full page of results can have been cut off by the limit
+    total = count_matches(query) if len(results) >= SEARCH_RESULTS_LIMIT else len(results)
+    
+    context = {
+        'query': query,
+        'products': results,
+        'total': total,
+        'cards': render_product_cards(request, results),
+    }
+    
+    return render(request, 'products/search.html', context)
@@ -18,3 +18,11 @@ class Review(models.Model):
     
     def __str__(self):
         return f'{self.user.username} - {self.plant.name} - {self.rating} stars'
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so the rating summary can be adjusted
+        # by the difference when the review is edited
+        instance._loaded_rating = (instance.__dict__.get('plant_id'), instance.__dict__.get('rating'))
+        return instance
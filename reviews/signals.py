@@ -0,0 +1,43 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from products import versions
+from products.models import PlantRatingSummary
+from .models import Review
+
+
+@receiver(post_save, sender=Review)
+def update_rating_summary_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Keep the plant's rating summary in step with a created or edited review.
+    """
+    if raw:
+        return
+    
+    old_plant_id, old_rating = getattr(instance, '_loaded_rating', (None, None))
+    if created or old_plant_id is None:
+        updated = PlantRatingSummary.apply_change(instance.plant_id, added=instance.rating)
+    elif old_plant_id != instance.plant_id:
+        PlantRatingSummary.apply_change(old_plant_id, removed=old_rating)
+        updated = PlantRatingSummary.apply_change(instance.plant_id, added=instance.rating)
+    elif old_rating != instance.rating:
+        updated = PlantRatingSummary.apply_change(instance.plant_id, added=instance.rating, removed=old_rating)
+    else:
+        updated = 1
+    
+    if not updated:
+        # No summary row yet for this plant, build it from the reviews table
+        PlantRatingSummary.rebuild(plant_ids=[instance.plant_id])
+    
+    instance._loaded_rating = (instance.plant_id, instance.rating)
+    versions.bump('reviews')
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_summary_on_delete(sender, instance, **kwargs):
+    """
+    Remove a deleted review from the plant's rating summary.
+    A missing summary is left for the rebuild command to create.
+    """
+    plant_id, rating = getattr(instance, '_loaded_rating', (instance.plant_id, instance.rating))
+    PlantRatingSummary.apply_change(plant_id, removed=rating)
+    versions.bump('reviews')